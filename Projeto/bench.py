@@ -0,0 +1,218 @@
+"""Benchmark the Sudoku cluster end to end.
+
+Starts clusters of WorkerNodes on localhost inside this process (one per
+combination of node count, handicap and mode, each stopped before the next
+starts), sends a reproducible corpus of puzzles to the first node's /solve and
+writes a JSON report with latency percentiles, throughput and validations per
+solve for each combination.
+
+    python3 bench.py --nodes 1 2 4 --handicaps 0 5 --empty 40 50 58 --puzzles 20 -o bench.json
+
+With --engines it instead compares the solver engines of sudoku.py on the
+same corpus in this process, timing Sudoku.solve for the first solution and
+for every solution of each puzzle:
+
+    python3 bench.py --engines backtrack dlx --empty 40 50 58 -o engines.json
+
+All nodes share this process and its GIL, so absolute numbers are lower than
+on separate machines; the report is meant for comparing changes to the solver
+and the scheduler against each other on the same host.
+"""
+import argparse
+import contextlib
+import json
+import os
+import platform
+import random
+import sys
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from gen import generate_sudoku
+from node import WorkerNode
+from sudoku import ENGINES, Sudoku, numpy
+
+
+def build_corpus(empty_levels, puzzles, seed):
+    """The same seed always yields the same puzzles, level by level."""
+    rng = random.Random(seed)
+    return {empty: [generate_sudoku(empty, rng).grid for _ in range(puzzles)] for empty in empty_levels}
+
+
+def start_cluster(size, handicap, mode, http_port, p2p_port, timeout=10):
+    anchor_address = f"127.0.0.1:{p2p_port}"
+    nodes = []
+    for i in range(size):
+        node = WorkerNode(http_port + i, p2p_port + i, handicap, None if i == 0 else anchor_address, mode, cache_mb=0)
+        node.start()
+        nodes.append(node)
+        if i == 0:
+            time.sleep(0.2)  # let the anchor listen before the others join
+
+    deadline = time.monotonic() + timeout
+    while len(nodes[0].live_nodes()) < size:
+        if time.monotonic() > deadline:
+            raise RuntimeError(f"Only {len(nodes[0].live_nodes())} of {size} nodes joined")
+        time.sleep(0.1)
+    return nodes
+
+
+def stop_cluster(nodes):
+    for node in nodes:
+        node.stop()
+
+
+def total_validations(nodes):
+    total = 0
+    for node in nodes:
+        with node.lock:
+            total += sum(node.validation_counts.values())
+    return total
+
+
+def solve(http_port, grid, timeout):
+    request = urllib.request.Request(
+        f"http://localhost:{http_port}/solve",
+        data=json.dumps({"sudoku": grid}).encode('utf-8'),
+        headers={'Content-Type': 'application/json'}
+    )
+    start = time.perf_counter()
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        body = json.loads(response.read())
+    return time.perf_counter() - start, body.get("message") == "Sudoku solved successfully!"
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of a sorted list."""
+    if not values:
+        return None
+    return values[min(len(values) - 1, max(0, round(fraction * len(values)) - 1))]
+
+
+def run_level(nodes, puzzles, concurrency, timeout):
+    http_port = nodes[0].http_port
+    validations_before = total_validations(nodes)
+    latencies = []
+    failures = 0
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for future in [executor.submit(solve, http_port, grid, timeout) for grid in puzzles]:
+            try:
+                latency, solved = future.result()
+            except Exception:
+                failures += 1
+                continue
+            latencies.append(latency)
+            failures += not solved
+    elapsed = time.perf_counter() - start
+    validations = total_validations(nodes) - validations_before
+
+    latencies.sort()
+    return {
+        "puzzles": len(puzzles),
+        "failures": failures,
+        "latency_ms": {
+            name: round(percentile(latencies, fraction) * 1000, 3) if latencies else None
+            for name, fraction in (("p50", 0.5), ("p90", 0.9), ("p99", 0.99), ("max", 1.0))
+        },
+        "mean_latency_ms": round(sum(latencies) / len(latencies) * 1000, 3) if latencies else None,
+        "throughput": round(len(latencies) / elapsed, 3) if elapsed else None,
+        "validations_per_solve": round(validations / len(puzzles), 1)
+    }
+
+
+def run_engine(engine, puzzles, limit):
+    latencies = []
+    validations = 0
+    solutions = 0
+    for grid in puzzles:
+        start = time.perf_counter()
+        found, spent = Sudoku(grid, base_delay=0).solve(grid, limit, packed=True, engine=engine)
+        latencies.append(time.perf_counter() - start)
+        validations += spent
+        solutions += len(found)
+
+    latencies.sort()
+    return {
+        "latency_ms": {
+            name: round(percentile(latencies, fraction) * 1000, 3)
+            for name, fraction in (("p50", 0.5), ("p90", 0.9), ("max", 1.0))
+        },
+        "mean_latency_ms": round(sum(latencies) / len(latencies) * 1000, 3),
+        "solutions_per_puzzle": round(solutions / len(puzzles), 1),
+        "validations_per_solve": round(validations / len(puzzles), 1)
+    }
+
+
+def run_engines(corpus, engines, report, progress):
+    for empty, puzzles in corpus.items():
+        for task, limit in (("first", 1), ("all", None)):
+            for engine in engines:
+                result = run_engine(engine, puzzles, limit)
+                report["runs"].append({"engine": engine, "task": task, "empty": empty, **result})
+                print(f"{engine}, {task} solution(s), {empty} empty: p50 {result['latency_ms']['p50']} ms, "
+                      f"{result['solutions_per_puzzle']} solutions", file=progress)
+
+
+def run(args):
+    corpus = build_corpus(args.empty, args.puzzles, args.seed)
+    report = {
+        "meta": {
+            "seed": args.seed,
+            "puzzles_per_level": args.puzzles,
+            "concurrency": args.concurrency,
+            "python": platform.python_version(),
+            "numpy": numpy is not None,
+            "cpus": os.cpu_count(),
+            "started": time.strftime("%Y-%m-%dT%H:%M:%S")
+        },
+        "runs": []
+    }
+
+    progress = sys.stderr
+    if args.engines:
+        run_engines(corpus, args.engines, report, progress)
+        args.modes = []  # no clusters
+    port_offset = 0
+    for mode in args.modes:
+        for size in args.nodes:
+            for handicap in args.handicaps:
+                print(f"{mode}: {size} nodes, handicap {handicap} ms", file=progress)
+                # The nodes log every request; keep only the progress lines
+                with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull), contextlib.redirect_stderr(devnull):
+                    nodes = start_cluster(size, handicap, mode, args.http_port + port_offset, args.p2p_port + port_offset)
+                    port_offset += size
+                    try:
+                        for empty, puzzles in corpus.items():
+                            result = run_level(nodes, puzzles, args.concurrency, args.timeout)
+                            report["runs"].append({"mode": mode, "nodes": size, "handicap": handicap, "empty": empty, **result})
+                            print(f"  {empty} empty: p50 {result['latency_ms']['p50']} ms, "
+                                  f"{result['throughput']} solves/s", file=progress)
+                    finally:
+                        stop_cluster(nodes)
+
+    with open(args.output, 'w') as output:
+        json.dump(report, output, indent=2)
+    print(f"Report written to {args.output}", file=progress)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Sudoku cluster benchmark")
+    parser.add_argument('--nodes', type=int, nargs='+', default=[1, 2, 4], help="Cluster sizes to run")
+    parser.add_argument('--handicaps', type=int, nargs='+', default=[0], help="Node handicaps in ms")
+    parser.add_argument('--modes', choices=['tree', 'rows'], nargs='+', default=['tree'], help="Work distribution modes")
+    parser.add_argument('--empty', type=int, nargs='+', default=[40, 50, 58], help="Empty cells per puzzle, one corpus level each")
+    parser.add_argument('--puzzles', type=int, default=20, help="Puzzles per level")
+    parser.add_argument('--seed', type=int, default=2024, help="Seed of the puzzle corpus")
+    parser.add_argument('--concurrency', type=int, default=1, help="Requests in flight at once")
+    parser.add_argument('--engines', choices=ENGINES, nargs='+', help="Compare these solver engines instead of running clusters")
+    parser.add_argument('--timeout', type=float, default=120, help="Timeout of one /solve in seconds")
+    parser.add_argument('--http-port', type=int, default=9100, help="First HTTP port to use")
+    parser.add_argument('--p2p-port', type=int, default=9600, help="First P2P port to use")
+    parser.add_argument('-o', '--output', default='bench.json', help="Where to write the JSON report")
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    run(parse_args())
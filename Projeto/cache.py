@@ -0,0 +1,146 @@
+"""LRU cache of solved puzzles keyed by a canonical form under Sudoku symmetries.
+
+A puzzle is canonicalised by optionally transposing it, reordering bands,
+rows within bands, stacks and columns within stacks by invariants of the
+givens they hold, and relabelling digits in order of first appearance. Each of these
+is a Sudoku symmetry, so a solution stored in canonical orientation can be
+mapped back onto any puzzle that canonicalises to the same key.
+
+The ordering is a cheap heuristic rather than a full canonical labelling:
+equivalent puzzles whose invariants tie may still get different keys (a miss),
+but different keys never share a solution (no wrong hits).
+"""
+import sys
+import threading
+from collections import OrderedDict
+
+
+def transpose(grid):
+    return [list(row) for row in zip(*grid)]
+
+
+def line_order(grid):
+    """Bands, then rows within each band, sorted by invariants of their givens.
+
+    A row is described by how many givens it holds, how they spread over the
+    stacks, how full their columns are and how often their digits occur in
+    the whole grid; none of these change under the symmetries used here."""
+    column_counts = [sum(1 for r in range(9) if grid[r][c]) for c in range(9)]
+    digit_counts = [0] * 10
+    for row in grid:
+        for digit in row:
+            digit_counts[digit] += 1
+
+    def row_key(r):
+        stacks = sorted(sum(1 for c in range(s * 3, s * 3 + 3) if grid[r][c]) for s in range(3))
+        givens = [c for c in range(9) if grid[r][c]]
+        return (
+            len(givens),
+            stacks,
+            sorted(column_counts[c] for c in givens),
+            sorted(digit_counts[grid[r][c]] for c in givens)
+        )
+
+    def band_key(b):
+        return sorted(row_key(r) for r in range(b * 3, b * 3 + 3))
+
+    order = []
+    for band in sorted(range(3), key=band_key):
+        order.extend(sorted(range(band * 3, band * 3 + 3), key=row_key))
+    return order
+
+
+def apply_transform(grid, transform):
+    flipped, rows, cols, labels = transform
+    source = transpose(grid) if flipped else grid
+    return [[labels[source[r][c]] for c in cols] for r in rows]
+
+
+def invert_transform(grid, transform):
+    flipped, rows, cols, labels = transform
+    inverse_labels = {canonical: digit for digit, canonical in labels.items()}
+    source = [[0] * 9 for _ in range(9)]
+    for i, r in enumerate(rows):
+        for j, c in enumerate(cols):
+            source[r][c] = inverse_labels[grid[i][j]]
+    return transpose(source) if flipped else source
+
+
+def relabel(grid, rows, cols):
+    labels = {0: 0}
+    for r in rows:
+        for c in cols:
+            digit = grid[r][c]
+            if digit not in labels:
+                labels[digit] = len(labels)
+    for digit in range(1, 10):
+        if digit not in labels:
+            labels[digit] = len(labels)
+    return labels
+
+
+def canonical_form(grid):
+    """Return (key, transform) where key is the canonical puzzle as bytes."""
+    best = None
+    for flipped in (False, True):
+        source = transpose(grid) if flipped else grid
+        rows = line_order(source)
+        cols = line_order(transpose(source))
+        transform = (flipped, rows, cols, relabel(source, rows, cols))
+        key = bytes(digit for row in apply_transform(grid, transform) for digit in row)
+        if best is None or key < best[0]:
+            best = (key, transform)
+    return best
+
+
+class SolutionCache:
+    """Thread-safe LRU of canonical puzzle -> canonical solution, bounded in bytes."""
+    ENTRY_OVERHEAD = 100  # OrderedDict link and hash table slot, approximately
+
+    def __init__(self, max_bytes=16 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def entry_size(self, key, value):
+        return sys.getsizeof(key) + sys.getsizeof(value) + self.ENTRY_OVERHEAD
+
+    def get(self, grid):
+        key, transform = canonical_form(grid)
+        with self.lock:
+            value = self.entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+        canonical = [list(value[r * 9:r * 9 + 9]) for r in range(9)]
+        return invert_transform(canonical, transform)
+
+    def put(self, grid, solution):
+        key, transform = canonical_form(grid)
+        value = bytes(digit for row in apply_transform(solution, transform) for digit in row)
+        size = self.entry_size(key, value)
+        if size > self.max_bytes:
+            return
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                return
+            self.entries[key] = value
+            self.size += size
+            while self.size > self.max_bytes:
+                old_key, old_value = self.entries.popitem(last=False)
+                self.size -= self.entry_size(old_key, old_value)
+
+    def stats(self):
+        with self.lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": len(self.entries),
+                "bytes": self.size
+            }
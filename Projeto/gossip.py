@@ -0,0 +1,70 @@
+"""Cluster counters spread by gossip instead of being polled on every /stats.
+
+Every node owns one entry (its solved, validation, cancelled-subtask and
+coalesced-request counts plus the wall-clock time it last updated them). Counts only ever grow, so two
+views merge by taking the per-node maximum of each field, in any order and any
+number of times, and all nodes converge on the same totals (a grow-only
+counter CRDT).
+
+Staleness is measured against the owner's clock, so it is only meaningful
+while the node clocks are roughly in sync.
+"""
+import threading
+import time
+
+FIELDS = ("solved", "validations", "cancelled", "coalesced", "updated")
+
+
+class GossipCounters:
+    """Thread-safe merged view of every node's counters."""
+
+    def __init__(self, node):
+        self.node = node
+        self.entries = {}
+        self.lock = threading.Lock()
+
+    def update(self, solved, validations, cancelled, coalesced):
+        """Record this node's own counters."""
+        entry = {
+            "solved": solved,
+            "validations": validations,
+            "cancelled": cancelled,
+            "coalesced": coalesced,
+            "updated": time.time()
+        }
+        self.merge({self.node: entry})
+
+    def merge(self, entries):
+        with self.lock:
+            for node, entry in entries.items():
+                current = self.entries.setdefault(node, dict.fromkeys(FIELDS, 0))
+                for field in FIELDS:
+                    current[field] = max(current[field], entry.get(field, 0))
+
+    def snapshot(self):
+        with self.lock:
+            return {node: dict(entry) for node, entry in self.entries.items()}
+
+    def totals(self):
+        """Aggregate the view as /stats reports it, with each figure's age in seconds."""
+        now = time.time()
+        entries = self.snapshot()
+        nodes = [
+            {
+                "address": node,
+                "validations": entry["validations"],
+                "cancelled": entry["cancelled"],
+                "staleness": round(max(0.0, now - entry["updated"]), 3)
+            }
+            for node, entry in sorted(entries.items())
+        ]
+        return {
+            "all": {
+                "solved": sum(entry["solved"] for entry in entries.values()),
+                "validations": sum(entry["validations"] for entry in entries.values()),
+                "cancelled": sum(entry["cancelled"] for entry in entries.values()),
+                "coalesced": sum(entry["coalesced"] for entry in entries.values()),
+                "staleness": max((node["staleness"] for node in nodes), default=0.0)
+            },
+            "nodes": nodes
+        }
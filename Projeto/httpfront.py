@@ -0,0 +1,78 @@
+"""Concurrent HTTP/1.1 front end shared by node.py and server.py.
+
+PooledHTTPServer hands every accepted connection to a bounded thread pool, so
+a long /solve only holds one worker while /stats and /network keep being
+answered on the others. Handlers speak HTTP/1.1: a connection stays open
+between requests, and requests a client pipelines on it are read and
+answered in order. A connection left idle for KeepAliveHandler.timeout
+seconds is closed so it gives its worker back.
+"""
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+
+class PooledHTTPServer(HTTPServer):
+    allow_reuse_address = True
+    request_queue_size = 128
+    WORKERS = 64  # connections served at once; the others wait for a worker
+
+    def __init__(self, server_address, handler_class, workers=None):
+        super().__init__(server_address, handler_class)
+        self.executor = ThreadPoolExecutor(max_workers=workers or self.WORKERS, thread_name_prefix='http')
+        self.active = 0  # connections being served
+        self.active_lock = threading.Lock()
+
+    def process_request(self, request, client_address):
+        self.executor.submit(self.process_request_thread, request, client_address)
+
+    def process_request_thread(self, request, client_address):
+        with self.active_lock:
+            self.active += 1
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            with self.active_lock:
+                self.active -= 1
+            self.shutdown_request(request)
+
+    def handle_error(self, request, client_address):
+        # A keep-alive client hanging up between requests is routine
+        if isinstance(sys.exc_info()[1], ConnectionError):
+            return
+        super().handle_error(request, client_address)
+
+    def server_close(self):
+        super().server_close()
+        self.executor.shutdown(wait=False)
+
+
+class KeepAliveHandler(BaseHTTPRequestHandler):
+    """Every response carries its length (or is chunked), so the client can
+    tell where it ends without the connection being closed."""
+    protocol_version = 'HTTP/1.1'
+    timeout = 5  # seconds an idle keep-alive connection holds its worker, out of WORKERS
+
+    def send_body(self, body, content_type='application/json', status=200):
+        self.send_response(status)
+        self.send_header('Content-type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def start_chunked(self, content_type, status=200):
+        self.send_response(status)
+        self.send_header('Content-type', content_type)
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+
+    def write_chunk(self, data):
+        self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+        self.wfile.flush()
+
+    def end_chunked(self):
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
@@ -0,0 +1,120 @@
+"""Cluster membership kept up to date by a SWIM-style failure detector.
+
+Every member is alive or dead and has an incarnation number that only its
+owner increments. Updates are merged by incarnation first; at the same
+incarnation a death beats a sign of life, so a stale "alive" can never bring
+a failed node back. A node that hears it has been declared dead refutes it by
+announcing itself alive under a higher incarnation.
+
+Suspicion is local: a peer that misses a heartbeat is taken out of scheduling
+straight away, but only declared dead, and the news pushed to the cluster,
+once it stays silent for SUSPECT_TIMEOUT seconds.
+"""
+import threading
+import time
+
+ALIVE = 'alive'
+DEAD = 'dead'
+PRECEDENCE = {ALIVE: 0, DEAD: 1}
+
+
+class Membership:
+    SUSPECT_TIMEOUT = 3
+
+    def __init__(self, local):
+        self.local = local
+        self.members = {local: {"state": ALIVE, "incarnation": 0}}
+        self.suspects = {}  # address -> time.monotonic() of the first missed heartbeat
+        self.lock = threading.Lock()
+
+    def add(self, address):
+        """Record a newly joined node and return the update to announce."""
+        with self.lock:
+            entry = self.members.get(address)
+            incarnation = entry["incarnation"] + 1 if entry and entry["state"] == DEAD else 0
+            if entry is None or entry["state"] == DEAD:
+                self.members[address] = {"state": ALIVE, "incarnation": incarnation}
+            self.suspects.pop(address, None)
+            return {address: dict(self.members[address])}
+
+    def apply(self, updates):
+        """Merge updates from another node and return the ones that changed
+        this view (including our own refutation), to be passed on."""
+        changes = {}
+        with self.lock:
+            for address, update in updates.items():
+                if address == self.local:
+                    own = self.members[address]
+                    if update["state"] == DEAD and update["incarnation"] >= own["incarnation"]:
+                        own["incarnation"] = update["incarnation"] + 1
+                        changes[address] = dict(own)
+                    continue
+                current = self.members.get(address)
+                if current is None or self.supersedes(update, current):
+                    self.members[address] = {"state": update["state"], "incarnation": update["incarnation"]}
+                    changes[address] = dict(self.members[address])
+                    self.suspects.pop(address, None)
+        return changes
+
+    @staticmethod
+    def supersedes(update, current):
+        if update["incarnation"] != current["incarnation"]:
+            return update["incarnation"] > current["incarnation"]
+        return PRECEDENCE[update["state"]] > PRECEDENCE[current["state"]]
+
+    def suspect(self, address):
+        """Take a peer out of scheduling; True if it was not suspected yet."""
+        with self.lock:
+            entry = self.members.get(address)
+            if address == self.local or entry is None or entry["state"] != ALIVE or address in self.suspects:
+                return False
+            self.suspects[address] = time.monotonic()
+            return True
+
+    def suspected(self):
+        with self.lock:
+            return list(self.suspects)
+
+    def acknowledge(self, address):
+        """A heartbeat reply arrived: the peer is no longer suspected."""
+        with self.lock:
+            self.suspects.pop(address, None)
+
+    def expire(self):
+        """Declare dead the suspects that stayed silent too long, returning
+        the updates to announce."""
+        now = time.monotonic()
+        changes = {}
+        with self.lock:
+            for address, since in list(self.suspects.items()):
+                if now - since >= self.SUSPECT_TIMEOUT:
+                    del self.suspects[address]
+                    entry = self.members[address]
+                    entry["state"] = DEAD
+                    changes[address] = dict(entry)
+        return changes
+
+    def peers(self):
+        """Every member still believed alive, suspected or not, except ourselves."""
+        with self.lock:
+            return sorted(a for a, e in self.members.items() if e["state"] == ALIVE and a != self.local)
+
+    def live(self):
+        """Members fit to be given work: alive and not currently suspected."""
+        with self.lock:
+            return sorted(
+                a for a, e in self.members.items()
+                if e["state"] == ALIVE and a not in self.suspects
+            )
+
+    def leader(self):
+        """The lowest address among the members believed alive. Every node
+        works it out from its own view, so no election messages are needed:
+        the nodes agree on it once their views have converged, and a dead
+        leader is replaced as soon as its death is known."""
+        with self.lock:
+            return min(a for a, e in self.members.items() if e["state"] == ALIVE)
+
+    def snapshot(self):
+        with self.lock:
+            return {address: dict(entry) for address, entry in self.members.items()}
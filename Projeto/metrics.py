@@ -0,0 +1,144 @@
+"""Node metrics in the Prometheus text exposition format.
+
+Counters and fixed-bucket histograms are recorded into a shard owned by the
+recording thread, so the hot path takes no lock: a thread only locks once,
+to register its shard. A scrape sums the shards; the shards of threads that
+have ended are folded into a running total, since the nodes serve many
+requests on short-lived threads. Registration folds them too once the list
+has doubled since the last fold, so it stays bounded without a scraper. A
+scrape may miss an update made while it reads a shard, but never sees a
+counter go back.
+
+Values the node already keeps elsewhere are exposed through callbacks that
+run at scrape time.
+"""
+import threading
+from bisect import bisect_left
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+RATE_BUCKETS = (100, 1000, 10_000, 100_000, 1_000_000, 10_000_000)
+
+
+def format_labels(labels):
+    if not labels:
+        return ""
+    escaped = (
+        (name, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for name, value in labels
+    )
+    return "{" + ",".join(f'{name}="{value}"' for name, value in escaped) + "}"
+
+
+def format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metrics:
+    MIN_FOLD = 64  # registered shards below which registration never folds
+
+    def __init__(self):
+        self.families = {}  # name -> (type, help, buckets or callback)
+        self.local = threading.local()
+        self.shards = []  # (thread, shard) of threads that recorded something
+        self.retired = {}  # sums of the shards of ended threads
+        self.fold_at = self.MIN_FOLD  # registration folds once this many shards are listed
+        self.lock = threading.Lock()
+
+    def counter(self, name, help, callback=None):
+        """A counter recorded with inc(), or read from callback() when given.
+
+        A callback returns a number or a list of (labels dict, number)."""
+        self.families[name] = ("counter", help, callback)
+
+    def gauge(self, name, help, callback=None):
+        """A gauge moved with inc() (negative amounts too), or read from callback()."""
+        self.families[name] = ("gauge", help, callback)
+
+    def histogram(self, name, help, buckets):
+        self.families[name] = ("histogram", help, tuple(buckets))
+
+    def shard(self):
+        try:
+            return self.local.shard
+        except AttributeError:
+            shard = self.local.shard = {}
+            with self.lock:
+                self.shards.append((threading.current_thread(), shard))
+                if len(self.shards) >= self.fold_at:
+                    self.fold()
+            return shard
+
+    def inc(self, name, amount=1, **labels):
+        shard = self.shard()
+        key = (name, tuple(sorted(labels.items())))
+        shard[key] = shard.get(key, 0) + amount
+
+    def observe(self, name, value, **labels):
+        buckets = self.families[name][2]
+        shard = self.shard()
+        key = (name, tuple(sorted(labels.items())))
+        counts = shard.get(key)
+        if counts is None:
+            # One slot per bucket, one for +Inf, then the sum of the values
+            counts = shard[key] = [0] * (len(buckets) + 1) + [0.0]
+        counts[bisect_left(buckets, value)] += 1
+        counts[-1] += value
+
+    @staticmethod
+    def add_into(totals, shard):
+        for key, value in list(shard.items()):
+            if isinstance(value, list):
+                current = totals.get(key)
+                totals[key] = list(value) if current is None else [a + b for a, b in zip(current, value)]
+            else:
+                totals[key] = totals.get(key, 0) + value
+
+    def fold(self):
+        """Add the shards of ended threads into retired; needs self.lock."""
+        live = []
+        for thread, shard in self.shards:
+            if thread.is_alive():
+                live.append((thread, shard))
+            else:
+                self.add_into(self.retired, shard)
+        self.shards = live
+        self.fold_at = max(self.MIN_FOLD, 2 * len(live))
+
+    def collect(self):
+        with self.lock:
+            self.fold()
+            live = list(self.shards)
+            totals = {key: list(value) if isinstance(value, list) else value for key, value in self.retired.items()}
+        for _, shard in live:
+            self.add_into(totals, shard)
+        return totals
+
+    def render(self):
+        totals = self.collect()
+        series = {}
+        for (name, labels), value in totals.items():
+            series.setdefault(name, []).append((labels, value))
+
+        lines = []
+        for name, (kind, help, extra) in self.families.items():
+            lines.append(f"# HELP {name} {help}")
+            lines.append(f"# TYPE {name} {kind}")
+            if kind == "histogram":
+                for labels, counts in sorted(series.get(name, [])):
+                    cumulative = 0
+                    for bound, count in zip(extra + ("+Inf",), counts):
+                        cumulative += count
+                        le = bound if bound == "+Inf" else format_value(bound)
+                        lines.append(f"{name}_bucket{format_labels(labels + (('le', le),))} {cumulative}")
+                    lines.append(f"{name}_sum{format_labels(labels)} {format_value(counts[-1])}")
+                    lines.append(f"{name}_count{format_labels(labels)} {cumulative}")
+                continue
+            if extra is not None:
+                value = extra()
+                samples = value if isinstance(value, list) else [({}, value)]
+                samples = [(tuple(sorted(labels.items())), value) for labels, value in samples]
+            else:
+                samples = series.get(name, [])
+            for labels, value in sorted(samples):
+                lines.append(f"{name}{format_labels(labels)} {format_value(value)}")
+        return "\n".join(lines) + "\n"
@@ -1,122 +1,514 @@
 import argparse
+import asyncio
+import itertools
+import multiprocessing
+import os
+import random
 import socket
 import json
 import threading
-from sudoku import Sudoku
-import itertools
-from http.server import BaseHTTPRequestHandler, HTTPServer
-
-
-class SudokuServerHandler(BaseHTTPRequestHandler):
-    anchor_address = ('localhost', 7000)
+import time
+import uuid
+from collections import OrderedDict, deque
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from sudoku import BACKTRACK, ENGINES, Board, Cancelled, Sudoku, solve_packed, validate_batch
+from cache import SolutionCache
+from gossip import GossipCounters
+from membership import DEAD, Membership
+from metrics import LATENCY_BUCKETS, RATE_BUCKETS, Metrics
+from tracing import Trace, Tracer
+from scheduler import DurationHistory, ThroughputTracker, apportion
+from protocol import (
+    BINARY, HEADER, JSON, AsyncPeerPool, ConnectionClosed, PeerPool, choose_codec, encode, frame, packed, parse,
+    read_frame, recv_frame, rows_of, send_message
+)
+from httpfront import KeepAliveHandler, PooledHTTPServer
+
+LOCAL = 'local'  # a node coordinates the solves posted to its own HTTP port
+LEADER = 'leader'  # they are relayed to the elected leader
+
+
+class SudokuServerHandler(KeepAliveHandler):
+    BATCH_WINDOW = 64  # puzzles of one batch in flight at once
     def __init__(self, worker_node, *args, **kwargs):
         self.worker_node = worker_node
         super().__init__(*args, **kwargs)
 
-        
     def do_POST(self):
         if self.path == '/solve':
             self.process_solve_request()
+        elif self.path == '/solve/batch':
+            self.process_batch_request()
         else:
             self.send_error(404, "Endpoint not found")
 
     def do_GET(self):
         if self.path in ['/stats', '/network']:
             self.process_get_request()
+        elif self.path == '/metrics':
+            # This node's own figures; every node answers for itself
+            self.send_body(self.worker_node.metrics.render().encode('utf-8'), 'text/plain; version=0.0.4')
+        elif self.path.startswith('/trace/'):
+            self.process_trace_request()
         else:
             self.send_error(404, "Endpoint not found")
 
     def process_solve_request(self):
         try:
             content_length = int(self.headers.get('Content-Length', 0))
-            post_data = self.rfile.read(content_length)
-            print(f"Received POST data: {post_data}")
-            data = json.loads(post_data.decode('utf-8'))
-            print(f"Decoded JSON data: {data}")
-
-            anchor_response = self.send_to_anchor(data, 'solve')
-            print(f"Received response from anchor: {anchor_response}")
-
-            self.send_response(200)
-            self.send_header('Content-type', 'application/json')
-            self.end_headers()
-            self.wfile.write(anchor_response)
+            data = json.loads(self.rfile.read(content_length).decode('utf-8'))
+            if data.get('engine', BACKTRACK) not in ENGINES:
+                self.send_error(400, f"Bad Request: engine must be one of {', '.join(ENGINES)}")
+                return
+            self.send_body(encode(self.worker_node.coordinate(data).result()))
         except json.JSONDecodeError as e:
             self.send_error(400, f"Bad Request: Unable to decode JSON. Error: {e}")
         except Exception as e:
             self.send_error(500, f"Internal Server Error: {e}")
             print(f"Exception: {e}")
 
-    def forward_to_anchor(self, endpoint):
+    def process_batch_request(self):
+        try:
+            content_length = int(self.headers.get('Content-Length', 0))
+            data = json.loads(self.rfile.read(content_length).decode('utf-8'))
+            sudokus = list(data['sudokus'])
+        except (json.JSONDecodeError, KeyError, TypeError) as e:
+            self.send_error(400, f"Bad Request: expected {{\"sudokus\": [...]}}. Error: {e}")
+            return
+        engine = data.get('engine', BACKTRACK)
+        if engine not in ENGINES:
+            self.send_error(400, f"Bad Request: engine must be one of {', '.join(ENGINES)}")
+            return
+
+        # Chunked, so the connection can be kept once the last result is out
+        self.start_chunked('application/x-ndjson')
         try:
-            response = self.send_to_anchor({}, endpoint)
-            self.send_response(200)
-            self.send_header('Content-type', 'application/json')
-            self.end_headers()
-            self.wfile.write(response)
+            for index, result in self.solve_batch(sudokus, engine):
+                self.write_chunk(encode({"index": index, **result}) + b"\n")
+            self.end_chunked()
+        except (BrokenPipeError, ConnectionResetError) as e:
+            self.close_connection = True
+            print(f"Batch client went away: {e}")
+
+    def solve_batch(self, sudokus, engine=BACKTRACK):
+        """Yield (index, response) in completion order, keeping at most
+        BATCH_WINDOW puzzles of the batch in flight on the cluster."""
+        items = enumerate(sudokus)
+        pending = {}
+        while True:
+            for index, grid in items:
+                pending[self.worker_node.coordinate({"sudoku": grid, "engine": engine})] = index
+                if len(pending) >= self.BATCH_WINDOW:
+                    break
+            if not pending:
+                return
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                index = pending.pop(future)
+                try:
+                    yield index, future.result()
+                except Exception as e:
+                    yield index, {"error": str(e)}
+
+    def process_get_request(self):
+        try:
+            if self.path == '/stats':
+                # Every node holds the gossiped totals, so any of them can answer
+                response = self.worker_node.collect_stats_from_nodes()
+            else:
+                response = self.send_to_leader({}, self.path.strip("/"))
+            self.send_body(encode(response))
         except Exception as e:
             self.send_error(500, f"Internal Server Error: {e}")
             print(f"Exception: {e}")
 
-    def send_to_anchor(self, data, endpoint):
+    def process_trace_request(self):
         try:
-            with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
-                s.connect(self.anchor_address)
-                s.sendall(json.dumps({"type": endpoint, "data": data}).encode('utf-8'))
-                return self.receive_full_response(s)
+            response = self.worker_node.find_trace(self.path[len('/trace/'):])
+            self.send_body(encode(response), status=404 if "error" in response else 200)
         except Exception as e:
-            print(f"Error communicating with anchor: {e}")
+            self.send_error(500, f"Internal Server Error: {e}")
+            print(f"Exception: {e}")
+
+    def send_to_leader(self, data, endpoint):
+        try:
+            return self.worker_node.pool.request(self.worker_node.membership.leader(), {"type": endpoint, "data": data})
+        except Exception as e:
+            print(f"Error communicating with leader: {e}")
             raise
 
-    def receive_full_response(self, sock):
-        buffer_size = 4096
-        response = b""
-        while True:
-            part = sock.recv(buffer_size)
-            response += part
-            if len(part) < buffer_size:
-                break
-        return response
+
+class SubtreeSearch:
+    """One search-tree solve: independent subtrees spread over the nodes.
+
+    Each node owns a queue of subtrees, sized by its measured throughput, and
+    has at most one of them in flight. A node whose queue runs dry steals from
+    the back of the busiest queue, so the work follows the search instead of
+    the grid layout; with nothing left to steal it takes a copy of a subtree
+    still held by a much slower node, or of one that has run past the hedge
+    percentile of recent subtree durations. Each subtree is copied at most
+    once; the first copy to answer is used and the other is cancelled.
+    Replies are handled in future callbacks, so no thread is parked per node."""
+
+    def __init__(self, node, workers, subtrees, trace, engine=BACKTRACK):
+        self.node = node
+        self.trace = trace
+        self.engine = engine
+        self.task = uuid.uuid4().hex
+        self.subtrees = subtrees
+        self.queues = {worker: deque() for worker in workers}
+        remaining = iter(range(len(subtrees)))
+        for worker, share in zip(workers, apportion(len(subtrees), node.throughput.weights(workers))):
+            self.queues[worker].extend(itertools.islice(remaining, share))
+        self.lock = threading.Lock()
+        self.busy = {}  # worker -> (subtree, cancel id, time sent)
+        self.copies = itertools.count()  # numbers the cancel ids of this search
+        self.copied = set()  # subtrees already given to a second node
+        self.answered = set()  # subtrees some node searched to the end
+        self.result = None
+        self.done = threading.Event()
+
+    def run(self):
+        for worker in list(self.queues):
+            self.dispatch(worker)
+        self.check_finished()
+        # Wake up whenever a subtree is due to run late, to hedge it on an idle node
+        while not self.done.wait(self.hedge_wait()):
+            for worker in list(self.queues):
+                self.dispatch(worker)
+        return self.result
+
+    def hedge_wait(self):
+        """Seconds until the next subtree in flight runs late, or None when
+        there is no estimate of how long subtrees take yet."""
+        with self.lock:
+            started = [sent for subtree, _, sent in self.busy.values() if subtree not in self.copied]
+        return self.node.time_to_hedge('solve_subtree', started)
+
+    def dispatch(self, worker):
+        with self.lock:
+            if self.result is not None or worker in self.busy:
+                return
+            subtree = self.next_subtree(worker)
+            if subtree is None:
+                return
+            cancel_id = f"{self.task}:{next(self.copies)}"
+            sent = time.monotonic()
+            self.busy[worker] = (subtree, cancel_id, sent)
+
+        message = {
+            'type': 'solve_subtree', 'sudoku': self.subtrees[subtree], 'task': cancel_id, 'trace': self.trace.id,
+            'engine': self.engine
+        }
+        future = self.node.pool.submit(worker, message)
+        future.add_done_callback(lambda future: self.on_response(worker, subtree, sent, future))
+
+    def on_response(self, worker, subtree, sent, future):
+        response = {}
+        try:
+            response = future.result()
+            solutions = self.node.process_response(response)
+        except Exception as e:
+            print(f"Error with worker {worker}: {e}")
+            solutions = None
+        received = time.monotonic()
+        self.node.record_request(self.trace, 'solve_subtree', worker, sent, received, response, solutions, subtree=subtree)
+        if solutions is not None:
+            self.node.throughput.record(worker, response.get('validations', 0), received - sent)
+
+        outstanding = ()
+        with self.lock:
+            self.busy.pop(worker, None)
+            twins = [(other, cancel_id, first) for other, (held, cancel_id, first) in self.busy.items() if held == subtree]
+            if solutions is None:
+                # Nobody else has it: hand it to the other nodes
+                self.requeue(worker, None if twins or subtree in self.answered else subtree)
+            elif not response.get('cancelled'):
+                if any(first < sent for _, _, first in twins):
+                    self.node.metrics.inc('sudoku_subtask_copy_wins_total', kind='solve_subtree')
+                self.answered.add(subtree)
+                outstanding = [(other, cancel_id) for other, cancel_id, _ in twins]  # the copy that lost the race
+                if solutions and self.result is None:
+                    valid = [s for s, ok in zip(solutions, validate_batch(solutions)) if ok]
+                    if valid:
+                        self.result = rows_of(valid[0])
+                        outstanding = [(other, cancel_id) for other, (_, cancel_id, _) in self.busy.items()]
+
+        # Stop the searches whose answer is no longer needed
+        for other, cancel_id in outstanding:
+            self.node.pool.submit(other, {'type': 'cancel', 'task': cancel_id})
+
+        if solutions is None:
+            self.node.membership.suspect(worker)
+            for idle in list(self.queues):
+                self.dispatch(idle)
+        else:
+            self.dispatch(worker)
+        self.check_finished()
+
+    def next_subtree(self, worker):
+        own = self.queues.get(worker)
+        if own:
+            return own.popleft()
+        victim = max(self.queues, key=lambda address: len(self.queues[address]))
+        if self.queues[victim]:
+            print(f"{worker} stealing subtree from {victim}")
+            return self.queues[victim].pop()
+        return self.straggler(worker)
+
+    def straggler(self, worker):
+        """A subtree to copy to `worker`, which has nothing else to do: the
+        one of the slowest busy node if `worker` is at least TAIL_SPEEDUP times
+        faster, or else the one running longest past the hedge threshold."""
+        throughput = self.node.throughput
+        candidates = [
+            (throughput.rate(other), other, subtree, sent) for other, (subtree, _, sent) in self.busy.items()
+            if subtree not in self.copied
+        ]
+        if not candidates:
+            return None
+        slowest_rate, slowest, subtree, _ = min(candidates)
+        if throughput.rate(worker) >= self.node.TAIL_SPEEDUP * slowest_rate:
+            print(f"{worker} taking a copy of the subtree held by {slowest}")
+            reason = 'slower'
+        else:
+            threshold = self.node.hedge_threshold('solve_subtree')
+            now = time.monotonic()
+            late = [
+                (sent, other, subtree) for _, other, subtree, sent in candidates
+                if threshold is not None and now - sent > threshold
+            ]
+            if not late:
+                return None
+            _, slowest, subtree = min(late)
+            print(f"{worker} hedging the subtree held by {slowest}, running for over {threshold:.3f}s")
+            reason = 'late'
+        self.node.metrics.inc('sudoku_subtask_copies_total', kind='solve_subtree', reason=reason)
+        self.copied.add(subtree)
+        return subtree
+
+    def requeue(self, worker, subtree):
+        """Give the subtrees of an unresponsive worker to the others, along
+        with the one it failed on, unless that one is covered elsewhere."""
+        pending = self.queues.pop(worker, deque())
+        if subtree is not None:
+            pending.appendleft(subtree)
+        if self.queues:
+            target = min(self.queues, key=lambda address: len(self.queues[address]))
+            self.queues[target].extend(pending)
+        elif pending:
+            print(f"No workers left, dropping {len(pending)} subtrees")
+
+    def check_finished(self):
+        with self.lock:
+            if self.result is not None or not (self.busy or any(self.queues.values())):
+                self.done.set()
+
+
+class CancelRegistry:
+    """Cancel events shared by the subtasks of each distributed solve.
+
+    Every message is served in its own thread, so a cancel can overtake the
+    subtask it targets; events are therefore created by whichever arrives
+    first and kept for the most recent REMEMBERED tasks."""
+    REMEMBERED = 1024
+
+    def __init__(self):
+        self.events = OrderedDict()
+        self.lock = threading.Lock()
+
+    def event(self, task):
+        with self.lock:
+            event = self.events.get(task)
+            if event is None:
+                event = self.events[task] = threading.Event()
+                if len(self.events) > self.REMEMBERED:
+                    self.events.popitem(last=False)
+            return event
+
+    def cancel(self, task):
+        self.event(task).set()
+
+
+class SingleFlight:
+    """At most one call per key at a time: callers that arrive while a call
+    is running wait for it and share its result instead of starting their
+    own. Only calls in flight are shared; nothing is kept once they end."""
+
+    def __init__(self):
+        self.calls = {}
+        self.coalesced = 0
+        self.lock = threading.Lock()
+
+    def do(self, key, function, *args):
+        with self.lock:
+            call = self.calls.get(key)
+            leader = call is None
+            if leader:
+                call = self.calls[key] = Future()
+            else:
+                self.coalesced += 1
+        if not leader:
+            return call.result()
+
+        try:
+            result = function(*args)
+            call.set_result(result)
+            return result
+        except Exception as e:
+            call.set_exception(e)
+            raise
+        finally:
+            with self.lock:
+                del self.calls[key]
 
 
 class WorkerNode:
-    def __init__(self, http_port, p2p_port, handicap, anchor=None):
+    SUBTREES_PER_NODE = 4
+    REQUEST_TIMEOUT = 5
+    GOSSIP_INTERVAL = 1  # seconds between gossip rounds
+    GOSSIP_FANOUT = 2  # peers contacted per round
+    PING_INTERVAL = 0.5  # seconds between failure detector rounds
+    PING_TIMEOUT = 1  # a heartbeat not answered within this makes the peer a suspect
+    TAIL_SPEEDUP = 2  # an idle node copies work held by nodes this many times slower
+    LOCAL_SOLVES = 64  # solves posted over HTTP coordinated at once
+
+    def __init__(self, http_port, p2p_port, handicap, anchor=None, mode='tree', cache_mb=16, processes=0, wire=BINARY,
+                 coordinator=LOCAL, hedge=95):
         self.http_port = http_port
         self.p2p_port = p2p_port
         self.handicap = handicap / 1000  # Converte para segundos
         self.anchor = anchor
+        self.mode = mode
+        self.coordinator = coordinator  # who coordinates the solves posted to this node's HTTP port
+        # How the other nodes reach this one: joiners announce their outbound address
+        self.address = f"{self.get_ip_address() if anchor else self.get_local_ip()}:{self.p2p_port}"
+        self.membership = Membership(self.address)
         self.nodes = {f"{self.get_local_ip()}:{self.p2p_port}": []}
         self.lock = threading.Lock()
         self.solved_count = 0
+        self.cancelled_count = 0
+        self.cancels = CancelRegistry()
+        self.in_flight = SingleFlight()
+        self.tracer = Tracer(self.address)
+        self.throughput = ThroughputTracker()
+        self.durations = DurationHistory()
+        self.hedge = hedge  # percentile of recent subtask durations past which one is copied; 0 never copies
         self.validation_counts = {f"{self.get_local_ip()}:{self.p2p_port}": 0}
+        self.wire = wire  # codec offered to peers; JSON keeps the traffic readable
+        self.metrics = Metrics()
+        self.inbound_connections = 0
+        self.httpd = None
+        self.server_socket = None
+        self.stopped = threading.Event()
+        self.pool = PeerPool(codec=wire, traffic=self.count_traffic)
+        self.cache = SolutionCache(int(cache_mb * 1024 * 1024))
+        self.counters = GossipCounters(self.get_node_key())
+        self.processes = processes
+        self.local_solves = ThreadPoolExecutor(max_workers=self.LOCAL_SOLVES, thread_name_prefix='coordinate')
+        self.process_pool = None
+        if processes:
+            # spawn, not fork: the node already runs threads when the pool starts
+            self.process_pool = ProcessPoolExecutor(processes, mp_context=multiprocessing.get_context('spawn'))
+        self.register_metrics()
 
     def get_local_ip(self):
         return socket.gethostbyname(socket.gethostname())
+
+    def register_metrics(self):
+        metrics = self.metrics
+        metrics.counter('sudoku_solves_total', "Solve requests answered by this node as coordinator, by result")
+        metrics.histogram('sudoku_solve_seconds', "Time to answer a solve request, cache and coalescing included", LATENCY_BUCKETS)
+        metrics.counter('sudoku_subtasks_total', "Subtasks sent to each peer, by outcome")
+        metrics.histogram('sudoku_subtask_seconds', "Round trip of a subtask sent to each peer", LATENCY_BUCKETS)
+        metrics.counter('sudoku_subtask_copies_total', "Subtasks copied to a second node, by kind and reason")
+        metrics.counter('sudoku_subtask_copy_wins_total', "Copied subtasks where the second node answered first")
+        metrics.histogram('sudoku_solve_part_seconds', "Time this node spent solving one subtask", LATENCY_BUCKETS)
+        metrics.histogram('sudoku_validations_per_second', "Validation rate of each subtask this node solved", RATE_BUCKETS)
+        metrics.counter('sudoku_validations_total', "Validations made by this node",
+                        lambda: self.validation_counts.get(self.get_node_key(), 0))
+        metrics.counter('sudoku_cancelled_subtasks_total', "Subtasks this node stopped on a cancel",
+                        lambda: self.cancelled_count)
+        metrics.counter('sudoku_coalesced_total', "Solve requests that joined an identical solve in flight",
+                        lambda: self.in_flight.coalesced)
+        metrics.counter('sudoku_p2p_bytes_total', "P2P frame bytes, by direction")
+        metrics.gauge('sudoku_queue_depth', "P2P requests received and not yet answered")
+        metrics.gauge('sudoku_connections', "Open connections, by kind", lambda: [
+            ({"kind": "p2p_in"}, self.inbound_connections),
+            ({"kind": "p2p_out"}, len(self.pool.connections)),
+            ({"kind": "http"}, self.httpd.active if self.httpd else 0)
+        ])
+        metrics.gauge('sudoku_peer_validation_rate', "Smoothed validations per second measured for each peer",
+                      lambda: [({"peer": peer}, stats["rate"]) for peer, stats in self.throughput.stats().items()])
+        metrics.gauge('sudoku_live_nodes', "Nodes this node believes alive, itself included",
+                      lambda: len(self.live_nodes()))
+
+    def count_traffic(self, direction, size):
+        self.metrics.inc('sudoku_p2p_bytes_total', size, direction=direction)
     
     def start(self):
-        p2p_thread = threading.Thread(target=self.run_p2p_server)
+        # Daemons, so a process hosting several nodes (bench.py) can exit; wait() keeps them up
+        p2p_thread = threading.Thread(target=self.run_p2p_server, daemon=True)
         p2p_thread.start()
-        http_thread = threading.Thread(target=self.run_http_server)
+        http_thread = threading.Thread(target=self.run_http_server, daemon=True)
         http_thread.start()
+        threading.Thread(target=self.run_gossip, daemon=True).start()
+        threading.Thread(target=self.run_failure_detector, daemon=True).start()
+        self.threads = [p2p_thread, http_thread]
+
+    def wait(self):
+        # Keeps the main thread alive: executors refuse new work once it exits.
+        for thread in self.threads:
+            thread.join()
+
+    def stop(self):
+        """Shut the node down: close both servers and the connections this node
+        opened to its peers, end the gossip and failure detector rounds and
+        release the pools, so a process can start and stop several nodes in
+        turn (bench.py). Inbound connections end as their peers hang up."""
+        self.stopped.set()
+        if self.httpd:
+            self.httpd.shutdown()
+            self.httpd.server_close()
+        self.pool.close()
+        self.stop_p2p_server()
+        self.local_solves.shutdown(wait=False, cancel_futures=True)
+        if self.process_pool:
+            self.process_pool.shutdown(wait=False, cancel_futures=True)
+
+    def stop_p2p_server(self):
+        if self.server_socket:
+            try:
+                self.server_socket.shutdown(socket.SHUT_RDWR)  # wakes up the blocked accept()
+            except OSError:
+                pass
+            self.server_socket.close()
 
     def run_http_server(self):
         server_address = ('', self.http_port)
-        httpd = HTTPServer(server_address, lambda *args, **kwargs: SudokuServerHandler(self, *args, **kwargs))
+        self.httpd = PooledHTTPServer(server_address, lambda *args, **kwargs: SudokuServerHandler(self, *args, **kwargs))
         print(f'HTTP server running on port {self.http_port}...')
-        httpd.serve_forever()
+        self.httpd.serve_forever()
 
     def run_p2p_server(self):
         server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
         server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
         server_socket.bind(('0.0.0.0', self.p2p_port))  # Escuta em todas as interfaces
         server_socket.listen(5)
+        self.server_socket = server_socket
         print(f"P2P server running on port {self.p2p_port}...")
 
         if self.anchor:
             self.join_network(self.anchor)
 
         while True:
-            client_socket, addr = server_socket.accept()
+            try:
+                client_socket, addr = server_socket.accept()
+            except OSError:
+                if self.stopped.is_set():
+                    return
+                raise
+            client_socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
             client_handler = threading.Thread(
                 target=self.handle_p2p_client,
                 args=(client_socket,)
@@ -126,19 +518,86 @@ class WorkerNode:
 
     def join_network(self, anchor):
         try:
-            anchor_host, anchor_port = anchor.split(':')
-            anchor_address = (anchor_host, int(anchor_port))
-            with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
-                s.connect(anchor_address)
-                print(self.get_ip_address())
-                s.sendall(json.dumps({"type": "join", "address": f"{self.get_ip_address()}:{self.p2p_port}"}).encode('utf-8'))
-                response = json.loads(self.receive_full_response(s).decode('utf-8'))
-                with self.lock:
-                    self.nodes = response['nodes']
+            print(self.get_ip_address())
+            response = self.pool.request(anchor, {"type": "join", "address": self.address}, self.REQUEST_TIMEOUT)
+            with self.lock:
+                self.nodes = response['nodes']
+            self.membership.apply(response.get('members', {}))
         except Exception as e:
             print(f"Error joining network: {e}")
 
 
+    def run_gossip(self):
+        """Push-pull this node's view of the counters to a few random peers
+        every round; replies are merged as they arrive, never waited on."""
+        while not self.stopped.wait(self.GOSSIP_INTERVAL):
+            self.refresh_counters()
+            peers = self.gossip_peers()
+            message = {"type": "gossip", "counters": self.counters.snapshot()}
+            for peer in random.sample(peers, min(self.GOSSIP_FANOUT, len(peers))):
+                self.pool.submit(peer, message).add_done_callback(self.on_gossip_reply)
+
+    def gossip_peers(self):
+        return self.membership.peers()
+
+    def on_gossip_reply(self, future):
+        try:
+            self.counters.merge(future.result().get("counters", {}))
+        except Exception:
+            pass  # the peer is down or busy; the next round tries someone else
+
+    def refresh_counters(self):
+        with self.lock:
+            solved = self.solved_count
+            validations = self.validation_counts.get(self.get_node_key(), 0)
+            cancelled = self.cancelled_count
+        self.counters.update(solved, validations, cancelled, self.in_flight.coalesced)
+
+    def run_failure_detector(self):
+        """Heartbeat one peer per round, in turn, plus every current suspect.
+
+        A peer that does not answer within PING_TIMEOUT is suspected and gets
+        no new work; one that stays silent for Membership.SUSPECT_TIMEOUT is
+        declared dead and the news is pushed to every node."""
+        rounds = 0
+        while not self.stopped.wait(self.PING_INTERVAL):
+            self.on_membership_changes(self.membership.expire())
+            peers = self.membership.peers()
+            if not peers:
+                continue
+            targets = {peers[rounds % len(peers)], *self.membership.suspected()}
+            rounds += 1
+            probes = {peer: self.pool.submit(peer, {"type": "ping"}) for peer in targets}
+            done, _ = wait(probes.values(), timeout=self.PING_TIMEOUT)
+            for peer, future in probes.items():
+                if future in done and future.exception() is None:
+                    self.membership.acknowledge(peer)
+                else:
+                    future.cancel()
+                    if self.membership.suspect(peer):
+                        print(f"Suspecting unresponsive node: {peer}")
+
+    def on_membership_changes(self, changes):
+        """Apply membership news locally and pass it on to every live peer."""
+        if not changes:
+            return
+        for address, entry in changes.items():
+            if address == self.address:
+                continue
+            if entry["state"] == DEAD:
+                self.remove_node(address)
+                # Fails whatever is still in flight on it, so searches requeue that work now
+                self.pool.discard(address)
+            else:
+                with self.lock:
+                    self.nodes.setdefault(address, [])
+        message = {"type": "membership", "members": changes}
+        for peer in self.membership.peers():
+            self.pool.submit(peer, message)
+
+    def live_nodes(self):
+        return self.membership.live()
+
     def get_ip_address(self):
         try:
             s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
@@ -150,55 +609,133 @@ class WorkerNode:
         return ip_address
 
     def handle_p2p_client(self, client_socket):
+        """Read framed requests until the peer hangs up, serving each one in
+        its own thread so a long solve does not hold back the others."""
+        send_lock = threading.Lock()
+        codec = JSON
+        with self.lock:
+            self.inbound_connections += 1
         try:
-            data = self.receive_full_response(client_socket)
-            message = json.loads(data.decode('utf-8'))
-            
-            match message['type']:
-                case 'join':
-                    with self.lock:
-                        new_node_address = message['address']
-                        local_address = f"{self.get_local_ip()}:{self.p2p_port}"
-                        
-                        if local_address not in self.nodes:
-                            self.nodes[local_address] = []
-                        self.nodes[local_address].append(new_node_address)
-                        
-                        if new_node_address not in self.nodes:
-                            self.nodes[new_node_address] = [local_address]
-                        else:
-                            self.nodes[new_node_address].append(local_address)
-                        
-                        client_socket.sendall(json.dumps({"nodes": self.nodes}).encode('utf-8'))
-                        print(f"Node joined: {message['address']}")
-
-                case 'solve':
-                    data = message['data']
-                    sudoku_grid = data.get('sudoku')
-                    if sudoku_grid:
-                        self.solve_sudoku(sudoku_grid, client_socket)
-
-                case 'solve_part':
-                    part = message['part']
-                    solutions = self.solve_part(part)
-                    client_socket.sendall(json.dumps({"solutions": solutions}).encode('utf-8'))
-
-                case 'stats':
-                    stats = self.get_stats()
-                    self.send_stats_to_client(client_socket, stats)
-
-                case 'network':
-                    self.send_network_info(client_socket)
-
-                case _:
-                    print(f"Tipo de mensagem desconhecido: {message['type']}")
-
-
+            while True:
+                payload = recv_frame(client_socket)
+                message = parse(payload, codec)
+                if message.get('type') == 'hello':
+                    # The peer sends nothing else until it has this reply, so no
+                    # frame in flight is read with the wrong codec
+                    reply = self.handle_hello(message)
+                    with send_lock:
+                        send_message(client_socket, reply)
+                    codec = reply['codec']
+                    continue
+                self.count_traffic("received", HEADER.size + len(payload))
+                self.metrics.inc('sudoku_queue_depth')
+                threading.Thread(
+                    target=self.serve_request,
+                    args=(message, client_socket, send_lock, codec)
+                ).start()
+        except ConnectionClosed:
+            pass
         except Exception as e:
             print(f"Error handling P2P client: {e}")
         finally:
+            with self.lock:
+                self.inbound_connections -= 1
             client_socket.close()
 
+    def handle_hello(self, message):
+        codec = choose_codec(message.get('codecs', [])) if self.wire == BINARY else JSON
+        return {"codec": codec, "id": message.get("id")}
+
+    def serve_request(self, message, client_socket, send_lock, codec=JSON):
+        try:
+            response = self.handle_message(message)
+        except Exception as e:
+            print(f"Error handling P2P message: {e}")
+            response = {"error": str(e)}
+        try:
+            if response is not None:
+                with send_lock:
+                    size = send_message(client_socket, {**response, "id": message.get("id")}, codec)
+                self.count_traffic("sent", size)
+        except OSError as e:
+            print(f"Error replying to P2P client: {e}")
+        finally:
+            self.metrics.inc('sudoku_queue_depth', -1)
+
+    def handle_message(self, message):
+        match message['type']:
+            case 'join':
+                with self.lock:
+                    new_node_address = message['address']
+                    local_address = f"{self.get_local_ip()}:{self.p2p_port}"
+
+                    if local_address not in self.nodes:
+                        self.nodes[local_address] = []
+                    self.nodes[local_address].append(new_node_address)
+
+                    if new_node_address not in self.nodes:
+                        self.nodes[new_node_address] = [local_address]
+                    else:
+                        self.nodes[new_node_address].append(local_address)
+
+                    print(f"Node joined: {message['address']}")
+                    nodes = dict(self.nodes)
+
+                self.on_membership_changes(self.membership.add(new_node_address))
+                return {"nodes": nodes, "members": self.membership.snapshot()}
+
+            case 'ping':
+                return {"status": "alive"}
+
+            case 'membership':
+                self.on_membership_changes(self.membership.apply(message['members']))
+                return {"status": "ok"}
+
+            case 'solve':
+                return self.solve_request(message['data'])
+
+            case 'solve_part':
+                trace = Trace(message['trace'], self.address) if 'trace' in message else None
+                cancel = self.cancels.event(message['task']) if 'task' in message else None
+                solutions, validations = self.solve_part(
+                    message['part'], cancel=cancel, trace=trace, engine=message.get('engine', BACKTRACK)
+                )
+                if solutions is None:
+                    return self.traced({"solutions": [], "validations": validations, "cancelled": True}, trace)
+                return self.traced({"solutions": solutions, "validations": validations}, trace)
+
+            case 'solve_subtree':
+                trace = Trace(message['trace'], self.address) if 'trace' in message else None
+                cancel = self.cancels.event(message['task']) if 'task' in message else None
+                solutions, validations = self.solve_part(
+                    message['sudoku'], limit=1, cancel=cancel, trace=trace, engine=message.get('engine', BACKTRACK)
+                )
+                if solutions is None:
+                    return self.traced({"solutions": [], "validations": validations, "cancelled": True}, trace)
+                return self.traced({"solutions": solutions, "validations": validations}, trace)
+
+            case 'cancel':
+                self.cancels.cancel(message['task'])
+                return {"status": "ok"}
+
+            case 'stats':
+                return self.get_stats()
+
+            case 'gossip':
+                self.counters.merge(message['counters'])
+                return {"counters": self.counters.snapshot()}
+
+            case 'network':
+                return self.fetch_network_info()
+
+            case 'trace':
+                trace = self.tracer.get(message['data']['id'])
+                return trace if trace is not None else self.unknown_trace(message['data']['id'])
+
+            case _:
+                print(f"Tipo de mensagem desconhecido: {message['type']}")
+                return {"error": f"Unknown message type: {message['type']}"}
+
 
     def get_stats(self):
         if self.is_anchor_node():  # Verificar se este nó é o âncora
@@ -212,36 +749,12 @@ class WorkerNode:
 
 
     def collect_stats_from_nodes(self):
-        stats = {
-            "all": {
-                "solved": 0,
-                "validations": 0
-            },
-            "nodes": []
-        }
-        node_validation_counts = {}
-        
-        with self.lock:
-            nodes_copy = list(self.nodes.keys())
-
-        for node in nodes_copy:
-            if node != self.get_node_key():
-                node_stats = self.get_node_stats(node)
-                if node_stats:
-                    stats["all"]["solved"] += node_stats["solved"]
-                    node_validations = node_stats["validations"]
-                    stats["all"]["validations"] += node_validations
-                    node_validation_counts[node] = node_validations
-
-        with self.lock:
-            current_node_validations = self.validation_counts.get(self.get_node_key(), 0)
-            stats["all"]["solved"] += self.solved_count
-            stats["all"]["validations"] += current_node_validations
-            node_validation_counts[self.get_node_key()] = current_node_validations
-
-        for address, validations in node_validation_counts.items():
-            stats["nodes"].append({"address": address, "validations": validations})
-
+        """Cluster totals from the gossiped view; no peer is contacted here,
+        and every figure carries how many seconds old it is."""
+        self.refresh_counters()
+        stats = self.counters.totals()
+        stats["cache"] = self.cache.stats()
+        stats["throughput"] = self.throughput.stats()
         return stats
 
 
@@ -250,7 +763,9 @@ class WorkerNode:
         with self.lock:
             stats = {
                 "solved": self.solved_count,
-                "validations": self.validation_counts.get(node_key, 0)
+                "validations": self.validation_counts.get(node_key, 0),
+                "cancelled": self.cancelled_count,
+                "coalesced": self.in_flight.coalesced
             }
         return stats
 
@@ -259,203 +774,485 @@ class WorkerNode:
         return f"{socket.gethostbyname(socket.gethostname())}:{self.p2p_port}"
 
 
-    def get_node_stats(self, node):
-        node_host, node_port = node.split(':')
-        node_address = (node_host, int(node_port))
-        try:
-            with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
-                s.connect(node_address)
-                s.sendall(json.dumps({"type": "stats"}).encode('utf-8'))
-                response = json.loads(self.receive_full_response(s).decode('utf-8'))
-                return {
-                    "solved": response.get("solved", 0),
-                    "validations": response.get("validations", 0)
-                }
-        except Exception as e:
-            print(f"Error retrieving stats from node {node}: {e}")
-            return None
-
-
-    def send_stats_to_client(self, client_socket, stats):
-        client_socket.sendall(json.dumps(stats).encode('utf-8'))
-
-    
     #NETWORK
-    def send_network_info(self, client_socket):
-        network_info = self.fetch_network_info()
-        self.send_data(client_socket, network_info)
-
-
     def fetch_network_info(self):
         with self.lock:
             network_info = self.nodes.copy() 
         return network_info
 
 
-    def send_data(self, client_socket, data):
-        json_data = json.dumps(data).encode('utf-8')
-        client_socket.sendall(json_data)
-
     #SUDOKU SOLVE
 
 
-    def solve_sudoku(self, sudoku_grid, client_socket):
-        while True:
-            num_workers = len(self.nodes)
-            print(f"Number of workers: {num_workers}")
-            
-            parts = self.split_sudoku(sudoku_grid, num_workers)
-            all_solutions = self.distribute_and_collect(parts)
-
-            if all_solutions and all(part is not None for part in all_solutions):
-                combined_solution = self.combine_solutions(all_solutions)
-                response = {
-                    "message": "Sudoku solved successfully!" if combined_solution else "Failed to find a valid Sudoku solution.",
-                    "sudoku": combined_solution if combined_solution else sudoku_grid
-                }
-                if combined_solution:
-                    self.solved_count += 1
-
-                client_socket.sendall(json.dumps(response).encode('utf-8'))
-                break
-            else:
-                print("Retrying with fewer workers due to non-responsive nodes...")
+    def coordinate(self, data):
+        """Start the solve of a request posted to this node over HTTP and
+        return a Future of the response."""
+        leader = self.membership.leader()
+        if self.coordinator == LEADER and leader != self.address:
+            return self.pool.submit(leader, {"type": "solve", "data": data})
+        return self.local_solves.submit(self.solve_request, data)
+
+    def solve_request(self, data):
+        sudoku_grid = data.get('sudoku')
+        engine = data.get('engine', BACKTRACK)
+        if engine not in ENGINES:
+            return {"error": f"Unknown engine: {engine}"}
+        if sudoku_grid:
+            return self.solve_sudoku(sudoku_grid, engine)
+        return {"message": "Missing sudoku grid."}
+
+    def find_trace(self, trace_id):
+        """The trace with this id, from this node or, since any node may have
+        coordinated the solve, from whichever peer kept it."""
+        trace = self.tracer.get(trace_id)
+        if trace is not None:
+            return trace
+        message = {"type": "trace", "data": {"id": trace_id}}
+        requests = [self.pool.submit(peer, message) for peer in self.membership.peers()]
+        done, not_done = wait(requests, timeout=self.REQUEST_TIMEOUT)
+        for future in not_done:
+            future.cancel()
+        for future in done:
+            if future.exception() is None and "error" not in future.result():
+                return future.result()
+        return self.unknown_trace(trace_id)
+
+    @staticmethod
+    def unknown_trace(trace_id):
+        return {"error": f"Unknown trace: {trace_id}"}
+
+    def solve_sudoku(self, sudoku_grid, engine=BACKTRACK):
+        start = time.monotonic()
+        # A puzzle posted again while it is being solved on the same engine waits for that solve
+        solution, trace_id = self.in_flight.do((engine, packed(sudoku_grid)), self.find_solution, sudoku_grid, engine)
+        self.metrics.observe('sudoku_solve_seconds', time.monotonic() - start)
+        self.metrics.inc('sudoku_solves_total', result="solved" if solution else "failed")
+        return {**self.solution_response(sudoku_grid, solution), "trace": trace_id}
+
+    def find_solution(self, sudoku_grid, engine=BACKTRACK):
+        trace = self.tracer.start()
+        with trace.span('cache') as span:
+            solution = self.cache.get(sudoku_grid)
+            span["hit"] = solution is not None
+        if solution is None:
+            solution = self.solve_distributed(sudoku_grid, trace, engine)
+            if solution:
+                self.cache.put(sudoku_grid, solution)
+        return solution, trace.id
+
+    def solve_distributed(self, sudoku_grid, trace, engine=BACKTRACK):
+        if self.mode == 'tree':
+            return self.solve_search_tree(sudoku_grid, trace, engine)
+
+        workers = self.live_nodes()
+
+        # Rows in proportion to each node's throughput, but at least one each
+        # so slow nodes keep being measured; the tail copies cover for them
+        with trace.span('split', workers=len(workers)) as span:
+            sizes = apportion(len(sudoku_grid), self.throughput.weights(workers), minimum=1)
+            owners = [worker for worker, size in zip(workers, sizes) if size]
+            parts = self.split_sudoku(sudoku_grid, [size for size in sizes if size])
+            span["sizes"] = [size for size in sizes if size]
+        with trace.span('distribute'):
+            results = self.distribute_and_collect(parts, owners, trace, engine)
+        with trace.span('combine', candidates=[len(result or ()) for result in results]):
+            return self.combine_solutions(results)
+
+    def record_request(self, trace, name, worker, sent, received, response, solutions, **attributes):
+        """Record one request of a solve in the metrics and in the trace, with
+        the spans the worker sent back."""
+        if solutions is None:
+            outcome = "failed"
+        else:
+            outcome = "cancelled" if response.get("cancelled") else "ok"
+        self.metrics.observe('sudoku_subtask_seconds', received - sent, peer=worker)
+        if outcome == "ok":
+            self.durations.record(name, received - sent)
+        self.metrics.inc('sudoku_subtasks_total', peer=worker, outcome=outcome)
+        trace.add(
+            name, sent, received, worker=worker, outcome=outcome, validations=response.get('validations', 0),
+            remote=response.get('spans', []), **attributes
+        )
+
+    def hedge_threshold(self, kind):
+        """How long a subtask of this kind may run before it is copied to an
+        idle node, or None when hedging is off or not enough are known yet."""
+        if not self.hedge:
+            return None
+        return self.durations.percentile(kind, self.hedge / 100)
 
-    def split_sudoku(self, sudoku, num_workers):
-        order = [0] * num_workers
-        current_worker = 0
-        
-        index = 0
-        while index < len(sudoku):
-            order[current_worker] += 1
-            current_worker = (current_worker + 1) % num_workers
-            index += 1
+    def time_to_hedge(self, kind, started):
+        """Seconds until the next of the subtasks sent at these times runs
+        late, or None when there is no threshold to go by."""
+        threshold = self.hedge_threshold(kind)
+        if threshold is None:
+            return None
+        now = time.monotonic()
+        # Anything sent from now on runs late no sooner than a full threshold away
+        return min((sent + threshold for sent in started if sent + threshold > now), default=now + threshold) - now
 
-        print(f"Order of distribution: {order}")
+    def traced(self, response, trace):
+        if trace is not None:
+            response["spans"] = trace.spans
+        return response
 
-        parts = []
-        current_line = 0
-        worker_index = 0
+    def solution_response(self, sudoku_grid, combined_solution):
+        response = {
+            "message": "Sudoku solved successfully!" if combined_solution else "Failed to find a valid Sudoku solution.",
+            "sudoku": combined_solution if combined_solution else sudoku_grid
+        }
+        if combined_solution:
+            with self.lock:
+                self.solved_count += 1
+        return response
 
-        while worker_index < len(order):
-            lines_per_worker = order[worker_index]
-            parts.append(sudoku[current_line:current_line + lines_per_worker])
-            current_line += lines_per_worker
-            worker_index += 1
+    #SEARCH TREE
 
-        return parts
+    def solve_search_tree(self, sudoku_grid, trace, engine=BACKTRACK):
+        """Solve by handing independent subtrees of the search to the nodes.
 
+        Each node owns a queue of subtrees; a node whose queue runs dry steals
+        from the back of the busiest queue, so the work follows the search
+        instead of the grid layout."""
+        workers = self.live_nodes()
 
-    def distribute_and_collect(self, parts):
-        results = [None] * len(parts)
-        threads = []
+        with trace.span('split', workers=len(workers)) as span:
+            subtrees, validations = Sudoku(sudoku_grid).split_search(sudoku_grid, len(workers) * self.SUBTREES_PER_NODE)
+            span.update(subtrees=len(subtrees), validations=validations)
         with self.lock:
-            nodes_copy = list(self.nodes.keys())
-
-        for i, part in enumerate(parts):
-            if i >= len(nodes_copy):
-                break
-        
-            worker_address = nodes_copy[i]
-            thread = threading.Thread(
-                target=self.send_to_worker,
-                args=(i, part, results, worker_address)
-            )
-            threads.append(thread)
-            thread.start()
+            self.validation_counts[self.get_node_key()] += validations
 
+        with trace.span('search'):
+            return SubtreeSearch(self, workers, subtrees, trace, engine).run()
 
-        [thread.join() for thread in threads]
-
+    def remove_node(self, address):
         with self.lock:
-            for i, result in enumerate(results):
-                if result is None and nodes_copy[i % len(nodes_copy)] in self.nodes:
-                    worker_address = nodes_copy[i % len(nodes_copy)]
-                    print(f"Removing non-responsive worker: {worker_address}")
-                    del self.nodes[worker_address]
+            if address in self.nodes:
+                print(f"Removing non-responsive worker: {address}")
+                del self.nodes[address]
+            for neighbours in self.nodes.values():
+                if address in neighbours:
+                    neighbours.remove(address)
+
+    #ROW SLICES
+
+    def split_sudoku(self, sudoku, sizes):
+        """Cut the grid into consecutive row slices of the given sizes."""
+        parts = []
+        current_line = 0
+        for lines_per_worker in sizes:
+            parts.append(sudoku[current_line:current_line + lines_per_worker])
+            current_line += lines_per_worker
 
+        return parts
+
+
+    def distribute_and_collect(self, parts, owners, trace, engine=BACKTRACK):
+        """Send part i to owners[i] and collect every part's solutions.
+
+        A part whose node fails goes to the fastest live node that has not
+        failed it yet instead of restarting the puzzle; once every live node
+        has failed it, the search ends and the part's result stays None. A node left idle takes a copy of the part held
+        by the slowest node still busy, if it is TAIL_SPEEDUP times faster, or
+        of one that has run past the hedge percentile of recent part
+        durations. Each part is copied at most once; whichever copy answers
+        first is used and the other is cancelled."""
+        results = [None] * len(parts)
+        pending = {}  # future -> (part, worker, cancel id, time sent)
+        resent = set()
+        failed = {}  # part -> nodes that failed it
+        task = uuid.uuid4().hex
+        copies = itertools.count()
+        local_address = socket.gethostbyname(socket.gethostname())
+
+        def assign(i, worker):
+            cancel_id = f"{task}:{next(copies)}"
+            message = {
+                **self.create_message(i, parts[i], local_address), 'task': cancel_id, 'trace': trace.id, 'engine': engine
+            }
+            future = self.pool.submit(worker, message)
+            pending[future] = (i, worker, cancel_id, time.monotonic())
+
+        def cancel(futures):
+            for future in futures:
+                _, worker, cancel_id, _ = pending.pop(future)
+                self.pool.submit(worker, {'type': 'cancel', 'task': cancel_id})
+
+        for i, worker in enumerate(owners):
+            assign(i, worker)
+
+        while pending and any(result is None for result in results):
+            started = [sent for i, _, _, sent in pending.values() if i not in resent]
+            done, _ = wait(pending, timeout=self.time_to_hedge('solve_part', started), return_when=FIRST_COMPLETED)
+            for future in done:
+                if future not in pending:
+                    continue  # a copy cancelled since, as the other one answered
+                i, worker, _, sent = pending.pop(future)
+                response = {}
+                try:
+                    response = future.result()
+                    solutions = self.process_response(response)
+                except Exception as e:
+                    print(f"Error with worker {worker}: {e}")
+                    solutions = None
+                received = time.monotonic()
+                self.record_request(trace, 'solve_part', worker, sent, received, response, solutions, part=i)
+
+                if solutions is not None:
+                    if response.get('cancelled'):
+                        continue
+                    self.throughput.record(worker, response.get('validations', 0), received - sent)
+                    if results[i] is None:
+                        results[i] = solutions
+                        twins = [other for other, (j, _, _, _) in pending.items() if j == i]
+                        if any(pending[other][3] < sent for other in twins):
+                            self.metrics.inc('sudoku_subtask_copy_wins_total', kind='solve_part')
+                        cancel(twins)
+                    self.resend_tail(worker, pending, results, resent, assign)
+                    continue
+
+                self.membership.suspect(worker)
+                failed.setdefault(i, set()).add(worker)
+                if results[i] is None and all(j != i for j, _, _, _ in pending.values()):
+                    # Membership never suspects this node, so rule out every node that failed the part
+                    workers = [other for other in self.live_nodes() if other not in failed[i]]
+                    if workers:
+                        assign(i, max(workers, key=self.throughput.rate))
+                    else:
+                        print(f"No live workers left for part {i}")
+                        cancel(list(pending))
+            self.hedge_parts(pending, results, resent, assign)
+
+        # Copies still running lost their race
+        cancel(list(pending))
         return results
 
-    def send_to_worker(self, part_index, part, results, worker_address):
-        try:
-            worker_host, worker_port = worker_address.split(':')
-            worker_address = (worker_host, int(worker_port))
-            local_address = socket.gethostbyname(socket.gethostname())
-            
-            message = self.create_message(part_index, part, local_address)
-            
-            with socket.create_connection(worker_address) as sock:
-                self.send_message(sock, message)
-                response = self.receive_full_response(sock)
-                results[part_index] = self.process_response(response)
-                
-        except socket.error as e:
-            print(f"Socket error with worker {worker_address}: {e}")
-            results[part_index] = None
-        except json.JSONDecodeError as e:
-            print(f"JSON error while decoding response: {e}")
-            results[part_index] = None
-        except Exception as e:
-            print(f"Unexpected error with worker {worker_address}: {e}")
-            results[part_index] = None
+    def resend_tail(self, worker, pending, results, resent, assign):
+        if any(busy == worker for _, busy, _, _ in pending.values()):
+            return
+        held = [
+            (self.throughput.rate(busy), i, busy) for i, busy, _, _ in pending.values()
+            if results[i] is None and i not in resent
+        ]
+        if not held:
+            return
+        slowest_rate, i, slowest = min(held)
+        if self.throughput.rate(worker) >= self.TAIL_SPEEDUP * slowest_rate:
+            print(f"{worker} taking a copy of part {i} held by {slowest}")
+            self.metrics.inc('sudoku_subtask_copies_total', kind='solve_part', reason='slower')
+            resent.add(i)
+            assign(i, worker)
+
+    def hedge_parts(self, pending, results, resent, assign):
+        """Copy the parts running past the hedge threshold to idle nodes,
+        the longest running first and to the fastest node first."""
+        threshold = self.hedge_threshold('solve_part')
+        if threshold is None:
+            return
+        now = time.monotonic()
+        late = sorted(
+            (sent, i, holder) for i, holder, _, sent in pending.values()
+            if results[i] is None and i not in resent and now - sent > threshold
+        )
+        busy = {holder for _, holder, _, _ in pending.values()}
+        idle = sorted((worker for worker in self.live_nodes() if worker not in busy), key=self.throughput.rate, reverse=True)
+        for (_, i, holder), worker in zip(late, idle):
+            print(f"{worker} hedging part {i} held by {holder}, running for over {threshold:.3f}s")
+            self.metrics.inc('sudoku_subtask_copies_total', kind='solve_part', reason='late')
+            resent.add(i)
+            assign(i, worker)
 
     def create_message(self, part_index, part, local_address):
-        return json.dumps({
+        return {
             'type': 'solve_part',
             'part_index': part_index,
             'part': part,
             'address': f"{local_address}:{self.p2p_port}"
-        }).encode('utf-8')
-
-    def send_message(self, sock, message):
-        try:
-            sock.sendall(message)
-        except Exception as e:
-            print(f"Error sending message: {e}")
-            raise
+        }
 
     def process_response(self, response):
+        """The solutions of a reply as packed grids, whichever codec carried them."""
         try:
-            return json.loads(response.decode('utf-8')).get('solutions')
+            solutions = response.get('solutions')
+            return None if solutions is None else [packed(solution) for solution in solutions]
         except Exception as e:
             print(f"Error processing response: {e}")
             return None
 
-
-    def receive_full_response(self, sock):
-        buffer_size = 4096
-        response = b""
-        while True:
-            part = sock.recv(buffer_size)
-            response += part
-            if len(part) < buffer_size:
-                break
-        return response
-
     def combine_solutions(self, parts):
-        print("Combining solutions")
-        if any(part is None for part in parts):
-            print("One or more parts are None")
+        """Pick one candidate per part so that the columns and boxes of the
+        stacked rows hold every digit once, and return the full grid."""
+        if any(not part for part in parts):
+            print("One or more parts are missing or have no candidates")
             return None
 
-        all_combinations = list(itertools.product(*parts))
-        for combination in all_combinations:
-            combined_sudoku = [item for part in combination for item in part if isinstance(part, list)]
-            print(f"Combining part: {combined_sudoku}")
-            sudoku = Sudoku(combined_sudoku)
-
-            if sudoku.check():
-                return combined_sudoku
+        # Candidates as Boards placed at their rows, keeping only complete ones
+        boards = []
+        row_offset = 0
+        for part in parts:
+            loaded = (Board.from_bytes(candidate, top=row_offset) for candidate in part)
+            boards.append([board for board in loaded if board is not None and board.is_full()])
+            row_offset += len(part[0]) // 9
+
+        cols, boxes = [0] * 9, [0] * 9
+        chosen = []
+
+        def join(part_index):
+            if part_index == len(boards) - 1:
+                # The last rows either complete a valid grid or not; check them all at once
+                prefix = b"".join(board.to_bytes() for board in chosen)
+                candidates = boards[part_index]
+                for board, valid in zip(candidates, validate_batch([prefix + b.to_bytes() for b in candidates])):
+                    if valid:
+                        chosen.append(board)
+                        return True
+                return False
+            for board in boards[part_index]:
+                if any(cols[i] & board.cols[i] or boxes[i] & board.boxes[i] for i in range(9)):
+                    continue
+                for i in range(9):
+                    cols[i] |= board.cols[i]
+                    boxes[i] |= board.boxes[i]
+                chosen.append(board)
+                if join(part_index + 1):
+                    return True
+                chosen.pop()
+                for i in range(9):
+                    cols[i] ^= board.cols[i]
+                    boxes[i] ^= board.boxes[i]
+            return False
+
+        if join(0):
+            return rows_of(b"".join(board.to_bytes() for board in chosen))
         return None
 
-    def solve_part(self, part):
-        print(f"Solving part: {part}")
-        sudoku = Sudoku(part)
-        solutions, validations = sudoku.solve(part)
-        print(f"Solutions: {solutions}, Validations: {validations}")
+    def solve_part(self, part, limit=None, cancel=None, trace=None, engine=BACKTRACK):
+        """Return the solutions of a part as packed grids, or None if its cancel
+        event fires first, together with the validations spent."""
+        part = rows_of(part)
+        start = time.monotonic()
+        if self.process_pool:
+            solutions, validations = self.solve_part_in_process(part, limit, cancel, engine)
+        else:
+            sudoku = Sudoku(part, base_delay=self.handicap)
+            try:
+                solutions, validations = sudoku.solve(part, limit, throttle=True, cancel=cancel, packed=True, engine=engine)
+            except Cancelled:
+                solutions, validations = None, sudoku.validations
+
+        elapsed = time.monotonic() - start
+        self.metrics.observe('sudoku_solve_part_seconds', elapsed)
+        if solutions is not None and elapsed > 0:
+            self.metrics.observe('sudoku_validations_per_second', validations / elapsed)
+        if trace is not None:
+            trace.add(
+                'solve', start, start + elapsed, rows=len(part), engine=engine, validations=validations,
+                solutions=None if solutions is None else len(solutions)
+            )
         with self.lock:
             self.validation_counts[f"{socket.gethostbyname(socket.gethostname())}:{self.p2p_port}"] += validations
-        return solutions
+            if solutions is None:
+                self.cancelled_count += 1
+        return solutions, validations
+
+    def solve_part_in_process(self, part, limit, cancel, engine=BACKTRACK):
+        """A part still queued for a solver process is dropped on cancel;
+        one the process has already started is left to finish."""
+        future = self.process_pool.submit(solve_packed, packed(part), limit, self.handicap, engine)
+        while cancel is not None and not wait([future], timeout=0.05)[0]:
+            if cancel.is_set() and future.cancel():
+                return None, 0
+        blob, validations = future.result()
+        size = len(part) * 9
+        return [blob[start:start + size] for start in range(0, len(blob), size)], validations
+
+class AsyncWorkerNode(WorkerNode):
+    """WorkerNode that runs the P2P listener and every peer connection on a
+    single asyncio event loop.
+
+    Solving runs in a thread pool sized to the CPU count, and requests that
+    wait on other peers (solve, stats, join) run in a second, separate pool so
+    they can never starve the solvers they are waiting for. Liveness and
+    control messages never block, so they are answered on the loop itself and
+    cannot queue behind a busy pool and get a healthy node suspected."""
+    SOLVER_MESSAGES = {'solve_part', 'solve_subtree'}
+    INLINE_MESSAGES = {'ping', 'membership', 'cancel', 'gossip'}
+    COORDINATOR_THREADS = 32
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.loop = asyncio.new_event_loop()
+        self.pool = AsyncPeerPool(self.loop, codec=self.wire, traffic=self.count_traffic)
+        self.solver_executor = ThreadPoolExecutor(max_workers=max(self.processes, os.cpu_count() or 1))
+        self.coordinator_executor = ThreadPoolExecutor(max_workers=self.COORDINATOR_THREADS)
+        self.p2p_stopped = self.loop.create_future()
+
+    def run_p2p_server(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_until_complete(self.serve_p2p())
+
+    async def serve_p2p(self):
+        server = await asyncio.start_server(self.handle_p2p_connection, '0.0.0.0', self.p2p_port, reuse_address=True)
+        print(f"P2P server running on port {self.p2p_port} (asyncio)...")
+
+        if self.anchor:
+            await self.loop.run_in_executor(self.coordinator_executor, self.join_network, self.anchor)
+
+        async with server:
+            await self.p2p_stopped
+
+    def stop(self):
+        super().stop()
+        self.solver_executor.shutdown(wait=False, cancel_futures=True)
+        self.coordinator_executor.shutdown(wait=False, cancel_futures=True)
+
+    def stop_p2p_server(self):
+        self.loop.call_soon_threadsafe(self.p2p_stopped.set_result, None)
+
+    async def handle_p2p_connection(self, reader, writer):
+        codec = JSON
+        self.inbound_connections += 1  # only ever changed on the loop
+        try:
+            while True:
+                payload = await read_frame(reader)
+                message = parse(payload, codec)
+                if message.get('type') == 'hello':
+                    reply = self.handle_hello(message)
+                    writer.write(frame(reply))
+                    codec = reply['codec']
+                    continue
+                self.count_traffic("received", HEADER.size + len(payload))
+                self.metrics.inc('sudoku_queue_depth')
+                asyncio.ensure_future(self.serve_request_async(message, writer, codec))
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        except Exception as e:
+            print(f"Error handling P2P client: {e}")
+        finally:
+            self.inbound_connections -= 1
+            writer.close()
+
+    async def serve_request_async(self, message, writer, codec=JSON):
+        try:
+            if message.get('type') in self.INLINE_MESSAGES:
+                response = self.handle_message(message)
+            elif message.get('type') in self.SOLVER_MESSAGES:
+                response = await self.loop.run_in_executor(self.solver_executor, self.handle_message, message)
+            else:
+                response = await self.loop.run_in_executor(self.coordinator_executor, self.handle_message, message)
+        except Exception as e:
+            print(f"Error handling P2P message: {e}")
+            response = {"error": str(e)}
+        try:
+            if response is not None and not writer.is_closing():
+                data = frame({**response, "id": message.get("id")}, codec)
+                writer.write(data)
+                self.count_traffic("sent", len(data))
+                await writer.drain()
+        except OSError as e:
+            print(f"Error replying to P2P client: {e}")
+        finally:
+            self.metrics.inc('sudoku_queue_depth', -1)
 
 
 def parse_args():
@@ -464,10 +1261,24 @@ def parse_args():
     parser.add_argument('-s', '--p2p-port', type=int, required=True, help="Port for P2P server")
     parser.add_argument('-c', '--handicap', type=int, default=0, help="Handicap in ms for validation")
     parser.add_argument('-a', '--anchor', type=str, help="Anchor node address (e.g., 127.0.0.1:7000)")
+    parser.add_argument('-m', '--mode', choices=['tree', 'rows'], default='tree', help="Work distribution: search subtrees or row slices")
+    parser.add_argument('-w', '--processes', type=int, default=0, help="Solver processes per node (0 solves in the request thread)")
+    parser.add_argument('--cache-mb', type=float, default=16, help="Memory bound of the solution cache in MiB")
+    parser.add_argument('--async', dest='use_async', action='store_true', help="Serve P2P traffic on a single asyncio event loop")
+    parser.add_argument('--wire', choices=[BINARY, JSON], default=BINARY, help="P2P encoding offered to peers (json for debugging)")
+    parser.add_argument('--coordinator', choices=[LOCAL, LEADER], default=LOCAL,
+                        help="Coordinate HTTP solves on this node, or relay them to the elected leader")
+    parser.add_argument('--hedge', type=float, default=95,
+                        help="Copy a subtask to an idle node once it runs past this percentile of recent ones (0 disables)")
 
     return parser.parse_args()
 
 if __name__ == '__main__':
     args = parse_args()
-    worker_node = WorkerNode(args.http_port, args.p2p_port, args.handicap, args.anchor)
-    worker_node.start()
\ No newline at end of file
+    node_class = AsyncWorkerNode if args.use_async else WorkerNode
+    worker_node = node_class(
+        args.http_port, args.p2p_port, args.handicap, args.anchor, args.mode, args.cache_mb, args.processes, args.wire,
+        args.coordinator, args.hedge
+    )
+    worker_node.start()
+    worker_node.wait()
\ No newline at end of file
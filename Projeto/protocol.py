@@ -0,0 +1,484 @@
+"""Framed P2P messages and pooled peer connections for the Sudoku nodes.
+
+Every message is preceded by its length as a 4 byte big-endian unsigned
+integer. Requests carry an "id" that the peer copies into its reply, so
+several requests can be in flight on the same connection.
+
+A connection starts out carrying JSON. A client may open it with a "hello"
+offering the binary codec; once the peer accepts, every later frame in both
+directions starts with a kind byte. KIND_JSON frames hold JSON as before.
+KIND_GRIDS frames carry the grid fields of a message (GRID_FIELDS) as packed
+bytes of one byte per cell, with varint counts, and the remaining fields as a
+small JSON object. Grid fields decoded from binary frames are bytes (a list
+of bytes for "solutions"); packed() and rows_of() convert either form.
+"""
+import asyncio
+import itertools
+import json
+import socket
+import struct
+import threading
+from concurrent.futures import Future
+
+HEADER = struct.Struct('!I')
+FIELD = struct.Struct('!BB')  # field code, 1 if it holds a list of grids
+
+JSON = 'json'
+BINARY = 'binary'
+CODECS = (BINARY, JSON)
+
+KIND_JSON = 0
+KIND_GRIDS = 1
+GRID_FIELDS = ('part', 'sudoku', 'solutions')  # a field's code is its index
+GRID_LISTS = {'solutions'}
+
+
+class ConnectionClosed(ConnectionError):
+    """The peer closed the connection."""
+
+
+def packed(grid):
+    """A grid or row slice as bytes of one byte per cell."""
+    if isinstance(grid, (bytes, bytearray, memoryview)):
+        return bytes(grid)
+    return bytes(value for row in grid for value in row)
+
+
+def rows_of(grid):
+    """A grid or row slice as a list of rows."""
+    if isinstance(grid, (bytes, bytearray, memoryview)):
+        return [list(grid[start:start + 9]) for start in range(0, len(grid), 9)]
+    return grid
+
+
+def json_default(value):
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return rows_of(value)
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def encode(message):
+    return json.dumps(message, default=json_default).encode('utf-8')
+
+
+def decode(payload):
+    return json.loads(bytes(payload).decode('utf-8'))
+
+
+def encode_varint(value):
+    out = bytearray()
+    while value >= 0x80:
+        out.append(value & 0x7F | 0x80)
+        value >>= 7
+    out.append(value)
+    return out
+
+
+def decode_varint(data, pos):
+    value = shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, pos
+        shift += 7
+
+
+def encode_binary(message):
+    fields = []
+    try:
+        for code, name in enumerate(GRID_FIELDS):
+            value = message.get(name)
+            if value is None:
+                continue
+            grids = [packed(grid) for grid in value] if name in GRID_LISTS else [packed(value)]
+            if any(len(grid) != len(grids[0]) or len(grid) % 9 for grid in grids):
+                raise ValueError("grids of one field must have the same whole number of rows")
+            fields.append((code, name in GRID_LISTS, grids))
+    except (TypeError, ValueError):
+        fields = []
+    if not fields:
+        return bytes([KIND_JSON]) + encode(message)
+
+    meta = encode({key: value for key, value in message.items() if key not in GRID_FIELDS})
+    out = bytearray([KIND_GRIDS])
+    out += encode_varint(len(meta))
+    out += meta
+    out += encode_varint(len(fields))
+    for code, many, grids in fields:
+        out += FIELD.pack(code, many)
+        out += encode_varint(len(grids))
+        out += encode_varint(len(grids[0]) // 9 if grids else 0)
+        for grid in grids:
+            out += grid
+    return bytes(out)
+
+
+def decode_binary(payload):
+    data = memoryview(payload)
+    if data[0] == KIND_JSON:
+        return decode(data[1:])
+    if data[0] != KIND_GRIDS:
+        raise ValueError(f"Unknown frame kind {data[0]}")
+
+    size, pos = decode_varint(data, 1)
+    message = decode(data[pos:pos + size])
+    count, pos = decode_varint(data, pos + size)
+    for _ in range(count):
+        code, many = FIELD.unpack_from(data, pos)
+        grids, pos = decode_varint(data, pos + FIELD.size)
+        rows, pos = decode_varint(data, pos)
+        size = rows * 9
+        values = [bytes(data[start:start + size]) for start in range(pos, pos + grids * size, size or 1)]
+        pos += grids * size
+        message[GRID_FIELDS[code]] = values if many else values[0]
+    return message
+
+
+def choose_codec(offered):
+    """The codec a peer answering a "hello" switches to."""
+    return next((codec for codec in offered if codec in CODECS), JSON)
+
+
+def recv_exact(sock, size):
+    buffer = bytearray()
+    while len(buffer) < size:
+        chunk = sock.recv(size - len(buffer))
+        if not chunk:
+            raise ConnectionClosed("Connection closed by peer")
+        buffer += chunk
+    return bytes(buffer)
+
+
+def frame(message, codec=JSON):
+    payload = encode_binary(message) if codec == BINARY else encode(message)
+    return HEADER.pack(len(payload)) + payload
+
+
+def parse(payload, codec=JSON):
+    return decode_binary(payload) if codec == BINARY else decode(payload)
+
+
+def send_message(sock, message, codec=JSON):
+    """Send one framed message and return its size in bytes."""
+    data = frame(message, codec)
+    sock.sendall(data)
+    return len(data)
+
+
+def recv_frame(sock):
+    (size,) = HEADER.unpack(recv_exact(sock, HEADER.size))
+    return recv_exact(sock, size)
+
+
+def recv_message(sock, codec=JSON):
+    return parse(recv_frame(sock), codec)
+
+
+async def read_frame(reader):
+    (size,) = HEADER.unpack(await reader.readexactly(HEADER.size))
+    return await reader.readexactly(size)
+
+
+async def read_message(reader, codec=JSON):
+    return parse(await read_frame(reader), codec)
+
+
+def ignore_traffic(direction, size):
+    pass
+
+
+def parse_address(address):
+    if isinstance(address, str):
+        host, port = address.rsplit(':', 1)
+        return host, int(port)
+    return address
+
+
+def hello(codec):
+    return {"type": "hello", "codecs": [codec], "id": 0}
+
+
+def accepted_codec(reply):
+    # A peer without the binary codec answers the hello with an error
+    return reply.get("codec") if reply.get("codec") in CODECS else JSON
+
+
+class PeerConnection:
+    """A long-lived connection to one peer, multiplexing requests by id.
+
+    traffic(direction, size) is called with "sent" or "received" and the
+    size in bytes of every frame after the hello."""
+
+    def __init__(self, address, connect_timeout=5, codec=JSON, traffic=ignore_traffic):
+        self.address = address
+        self.traffic = traffic
+        self.sock = socket.create_connection(parse_address(address), timeout=connect_timeout)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.codec = JSON
+        self.queued = None  # requests held back until the peer answers the hello
+        if codec != JSON:
+            try:
+                send_message(self.sock, hello(codec))
+            except OSError:
+                self.sock.close()
+                raise
+            self.queued = []
+        self.sock.settimeout(None)
+        self.send_lock = threading.Lock()
+        self.lock = threading.Lock()
+        self.pending = {}
+        self.ids = itertools.count(1)
+        self.closed = False
+        threading.Thread(target=self.read_loop, daemon=True).start()
+
+    def submit(self, message):
+        future = Future()
+        future.set_running_or_notify_cancel()  # a request on the wire cannot be withdrawn
+        with self.lock:
+            if self.closed:
+                future.set_exception(ConnectionClosed(f"Connection to {self.address} is closed"))
+                return future
+            request_id = next(self.ids)
+            self.pending[request_id] = future
+            if self.queued is not None:
+                self.queued.append({**message, "id": request_id})
+                return future
+
+        try:
+            with self.send_lock:
+                self.traffic("sent", send_message(self.sock, {**message, "id": request_id}, self.codec))
+        except OSError as e:
+            self.fail(e)
+        return future
+
+    def read_loop(self):
+        try:
+            if self.queued is not None:
+                self.negotiate(recv_message(self.sock))
+            while True:
+                payload = recv_frame(self.sock)
+                self.traffic("received", HEADER.size + len(payload))
+                response = parse(payload, self.codec)
+                with self.lock:
+                    future = self.pending.pop(response.pop("id", None), None)
+                if future is not None:
+                    future.set_result(response)
+        except Exception as e:
+            # A malformed frame must fail the pending requests too, not just
+            # stop the reader and leave them waiting forever
+            self.fail(e)
+
+    def negotiate(self, reply):
+        # Holding send_lock keeps later requests behind the queued ones
+        with self.send_lock:
+            with self.lock:
+                self.codec = accepted_codec(reply)
+                queued, self.queued = self.queued, None
+            for message in queued:
+                self.traffic("sent", send_message(self.sock, message, self.codec))
+
+    def fail(self, error):
+        with self.lock:
+            self.closed = True
+            pending, self.pending = self.pending, {}
+        for future in pending.values():
+            if not future.done():
+                future.set_exception(ConnectionClosed(f"Connection to {self.address} lost: {error}"))
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)  # wakes up read_loop when closed from another thread
+        except OSError:
+            pass
+        self.sock.close()
+
+    def close(self):
+        self.fail(ConnectionClosed("Connection closed locally"))
+
+
+class PeerPool:
+    """One persistent PeerConnection per peer, reopened when it breaks."""
+
+    def __init__(self, connect_timeout=5, codec=JSON, traffic=ignore_traffic):
+        self.connect_timeout = connect_timeout
+        self.codec = codec
+        self.traffic = traffic
+        self.connections = {}
+        self.connecting = {}  # key -> Future of the connection being opened
+        self.lock = threading.Lock()
+
+    def get(self, address):
+        # The lock only guards the dicts: connecting to a peer that does not
+        # answer must not hold back requests to every other peer
+        key = address if isinstance(address, str) else f"{address[0]}:{address[1]}"
+        with self.lock:
+            connection = self.connections.get(key)
+            if connection is not None and not connection.closed:
+                return connection
+            pending = self.connecting.get(key)
+            if pending is None:
+                pending = self.connecting[key] = Future()
+                opener = True
+            else:
+                opener = False
+        if not opener:
+            return pending.result()
+        try:
+            connection = PeerConnection(key, self.connect_timeout, self.codec, self.traffic)
+        except BaseException as e:
+            with self.lock:
+                self.connecting.pop(key, None)
+            pending.set_exception(e)
+            raise
+        with self.lock:
+            self.connections[key] = connection
+            self.connecting.pop(key, None)
+        pending.set_result(connection)
+        return connection
+
+    def submit(self, address, message):
+        try:
+            return self.get(address).submit(message)
+        except OSError as e:
+            future = Future()
+            future.set_exception(e)
+            return future
+
+    def request(self, address, message, timeout=None):
+        return self.submit(address, message).result(timeout)
+
+    def discard(self, address):
+        with self.lock:
+            connection = self.connections.pop(address, None)
+        if connection is not None:
+            connection.close()
+
+    def close(self):
+        with self.lock:
+            connections, self.connections = self.connections, {}
+        for connection in connections.values():
+            connection.close()
+
+
+class AsyncPeerConnection:
+    """PeerConnection counterpart driven by an asyncio event loop."""
+
+    def __init__(self, address, reader, writer, codec=JSON, traffic=ignore_traffic):
+        self.address = address
+        self.reader = reader
+        self.writer = writer
+        self.codec = codec
+        self.traffic = traffic
+        self.pending = {}
+        self.ids = itertools.count(1)
+        self.closed = False
+        self.reader_task = asyncio.ensure_future(self.read_loop())
+
+    @classmethod
+    async def open(cls, address, connect_timeout=5, codec=JSON, traffic=ignore_traffic):
+        host, port = parse_address(address)
+        reader, writer = await asyncio.wait_for(asyncio.open_connection(host, port), connect_timeout)
+        if codec != JSON:
+            try:
+                writer.write(frame(hello(codec)))
+                codec = accepted_codec(await asyncio.wait_for(read_message(reader), connect_timeout))
+            except (asyncio.IncompleteReadError, asyncio.TimeoutError, OSError, ValueError):
+                writer.close()
+                raise
+        return cls(address, reader, writer, codec, traffic)
+
+    async def request(self, message):
+        if self.closed:
+            raise ConnectionClosed(f"Connection to {self.address} is closed")
+        request_id = next(self.ids)
+        future = asyncio.get_running_loop().create_future()
+        self.pending[request_id] = future
+        try:
+            data = frame({**message, "id": request_id}, self.codec)
+            self.writer.write(data)
+            self.traffic("sent", len(data))
+            await self.writer.drain()
+            return await future
+        finally:
+            self.pending.pop(request_id, None)
+
+    async def read_loop(self):
+        try:
+            while True:
+                payload = await read_frame(self.reader)
+                self.traffic("received", HEADER.size + len(payload))
+                response = parse(payload, self.codec)
+                future = self.pending.pop(response.pop("id", None), None)
+                if future is not None and not future.done():
+                    future.set_result(response)
+        except Exception as e:  # as in PeerConnection.read_loop
+            self.fail(e)
+
+    def fail(self, error):
+        self.closed = True
+        pending, self.pending = self.pending, {}
+        for future in pending.values():
+            if not future.done():
+                future.set_exception(ConnectionClosed(f"Connection to {self.address} lost: {error}"))
+        self.writer.close()
+
+    def close(self):
+        self.reader_task.cancel()
+        self.fail(ConnectionClosed("Connection closed locally"))
+
+
+class AsyncPeerPool:
+    """PeerPool counterpart whose connections all live on one event loop.
+
+    submit() and request() may be called from any thread other than the
+    loop's own; they return concurrent.futures.Future objects like PeerPool."""
+
+    def __init__(self, loop, connect_timeout=5, codec=JSON, traffic=ignore_traffic):
+        self.loop = loop
+        self.connect_timeout = connect_timeout
+        self.codec = codec
+        self.traffic = traffic
+        self.connections = {}
+        self.connecting = {}
+
+    async def get(self, address):
+        key = address if isinstance(address, str) else f"{address[0]}:{address[1]}"
+        connection = self.connections.get(key)
+        if connection is not None and not connection.closed:
+            return connection
+        if key not in self.connecting:
+            self.connecting[key] = asyncio.ensure_future(self.connect(key))
+        return await asyncio.shield(self.connecting[key])
+
+    async def connect(self, key):
+        try:
+            connection = await AsyncPeerConnection.open(key, self.connect_timeout, self.codec, self.traffic)
+            self.connections[key] = connection
+            return connection
+        finally:
+            self.connecting.pop(key, None)
+
+    async def request_async(self, address, message):
+        connection = await self.get(address)
+        return await connection.request(message)
+
+    def submit(self, address, message):
+        return asyncio.run_coroutine_threadsafe(self.request_async(address, message), self.loop)
+
+    def request(self, address, message, timeout=None):
+        future = self.submit(address, message)
+        try:
+            return future.result(timeout)
+        except TimeoutError:
+            future.cancel()
+            raise
+
+    def discard(self, address):
+        connection = self.connections.pop(address, None)
+        if connection is not None:
+            self.loop.call_soon_threadsafe(connection.close)
+
+    def close(self):
+        connections, self.connections = self.connections, {}
+        for connection in connections.values():
+            self.loop.call_soon_threadsafe(connection.close)
@@ -0,0 +1,102 @@
+"""Per-peer throughput estimates used to size the work sent to each node.
+
+The coordinator times every subtask it sends out and keeps an exponentially
+weighted moving average of each peer's validation rate (validations per
+second, network and queueing included) and of its response time. Subtasks
+too short to outweigh the round trip are left out, since their rate says
+more about how little work they held than about the node. Nodes it has not
+measured yet are assumed to be as fast as the average known node. The
+weights a split is sized by are clamped to within MAX_SKEW of the median
+node, so a single bad estimate cannot starve a node of work, nor the short
+subtasks it then gets skew its estimate further.
+It also keeps the durations of recent subtasks, against which a subtask
+still running is judged late enough to hedge.
+"""
+import threading
+from collections import deque
+
+
+def apportion(total, weights, minimum=0):
+    """Split `total` units over len(weights) shares in proportion to the
+    weights, rounding by largest remainder so the shares add up to total.
+
+    When the total covers it, every share first gets `minimum` units."""
+    if minimum and total >= minimum * len(weights):
+        rest = apportion(total - minimum * len(weights), weights)
+        return [share + minimum for share in rest]
+    weight_sum = sum(weights)
+    if weight_sum <= 0:
+        weights, weight_sum = [1] * len(weights), len(weights)
+    exact = [total * weight / weight_sum for weight in weights]
+    shares = [int(share) for share in exact]
+    by_remainder = sorted(range(len(weights)), key=lambda i: exact[i] - shares[i], reverse=True)
+    for i in by_remainder[:total - sum(shares)]:
+        shares[i] += 1
+    return shares
+
+
+class ThroughputTracker:
+    ALPHA = 0.3  # weight of the newest sample in the moving averages
+    MIN_RATE = 1.0  # keeps a node that answered with no validations schedulable
+    MIN_SECONDS = 0.05  # shorter subtasks are mostly round trip and are not sampled
+    MAX_SKEW = 4  # no weight is more than this many times above or below the median
+
+    def __init__(self):
+        self.rates = {}
+        self.latencies = {}
+        self.lock = threading.Lock()
+
+    def record(self, node, validations, seconds):
+        if seconds < self.MIN_SECONDS:
+            return
+        rate = max(validations / max(seconds, 1e-6), self.MIN_RATE)
+        with self.lock:
+            if node in self.rates:
+                rate = self.ALPHA * rate + (1 - self.ALPHA) * self.rates[node]
+                seconds = self.ALPHA * seconds + (1 - self.ALPHA) * self.latencies[node]
+            self.rates[node] = rate
+            self.latencies[node] = seconds
+
+    def rate(self, node):
+        with self.lock:
+            if node in self.rates:
+                return self.rates[node]
+            return sum(self.rates.values()) / len(self.rates) if self.rates else 1.0
+
+    def weights(self, nodes):
+        rates = [self.rate(node) for node in nodes]
+        if not rates:
+            return rates
+        median = sorted(rates)[len(rates) // 2]
+        return [min(max(rate, median / self.MAX_SKEW), median * self.MAX_SKEW) for rate in rates]
+
+    def stats(self):
+        with self.lock:
+            return {
+                node: {"rate": round(self.rates[node], 1), "latency": round(self.latencies[node], 4)}
+                for node in sorted(self.rates)
+            }
+
+
+class DurationHistory:
+    """The durations of the most recent subtasks of each kind, so the
+    coordinator can tell when one is running late compared with its peers."""
+    SIZE = 256  # durations kept per kind
+    MIN_SAMPLES = 20  # fewer than this gives no estimate
+
+    def __init__(self):
+        self.samples = {}
+        self.lock = threading.Lock()
+
+    def record(self, kind, seconds):
+        with self.lock:
+            self.samples.setdefault(kind, deque(maxlen=self.SIZE)).append(seconds)
+
+    def percentile(self, kind, fraction):
+        """Nearest-rank percentile of the recent durations, or None while
+        there are too few of them."""
+        with self.lock:
+            samples = sorted(self.samples.get(kind, ()))
+        if len(samples) < self.MIN_SAMPLES:
+            return None
+        return samples[min(len(samples) - 1, max(0, round(fraction * len(samples)) - 1))]
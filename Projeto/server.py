@@ -1,19 +1,27 @@
-from http.server import BaseHTTPRequestHandler, HTTPServer
 import json
-import socket
+from concurrent.futures import FIRST_COMPLETED, wait
+from httpfront import KeepAliveHandler, PooledHTTPServer
+from protocol import PeerPool, encode
+from sudoku import BACKTRACK, ENGINES
 
-class SudokuServerHandler(BaseHTTPRequestHandler):
-    anchor_server_address = ('localhost', 7000)  # Address of the anchor server
+class SudokuServerHandler(KeepAliveHandler):
+    anchor_server_address = 'localhost:7000'  # Address of the anchor server
+    anchor_pool = PeerPool()  # Persistent connections shared by all requests
+    batch_window = 64  # Puzzles of one batch in flight at once
 
     def do_POST(self):
         if self.path == '/solve':
             self.process_solve_request()
+        elif self.path == '/solve/batch':
+            self.process_batch_request()
         else:
             self.send_error(404, "Endpoint not found")
 
     def do_GET(self):
         if self.path in ['/stats', '/network']:
             self.process_get_request()
+        elif self.path.startswith('/trace/'):
+            self.process_trace_request()
         else:
             self.send_error(404, "Endpoint not found")
 
@@ -21,14 +29,11 @@ class SudokuServerHandler(BaseHTTPRequestHandler):
         """Process POST request for solving Sudoku."""
         try:
             content_length = int(self.headers.get('Content-Length', 0))
-            post_data = self.rfile.read(content_length)
-            print(f"Received POST data: {post_data}")
-            sudoku_data = self.decode_json(post_data)
-            print(f"Decoded JSON data: {sudoku_data}")
-
+            sudoku_data = self.decode_json(self.rfile.read(content_length))
+            if sudoku_data.get('engine', BACKTRACK) not in ENGINES:
+                self.handle_error(400, f"Bad Request: engine must be one of {', '.join(ENGINES)}")
+                return
             anchor_response = self.send_request_to_anchor(sudoku_data, 'solve')
-            print(f"Received response from anchor: {anchor_response}")
-
             self.send_response_with_json(anchor_response)
         except json.JSONDecodeError as e:
             self.handle_error(400, f"Bad Request: Unable to decode JSON. Error: {e}")
@@ -36,6 +41,49 @@ class SudokuServerHandler(BaseHTTPRequestHandler):
             self.handle_error(500, f"Internal Server Error: {e}")
             print(f"Exception: {e}")
 
+    def process_batch_request(self):
+        """Process POST request for solving many Sudokus, streaming NDJSON results."""
+        try:
+            content_length = int(self.headers.get('Content-Length', 0))
+            data = self.decode_json(self.rfile.read(content_length))
+            sudokus = list(data['sudokus'])
+        except (json.JSONDecodeError, KeyError, TypeError) as e:
+            self.handle_error(400, f"Bad Request: expected {{\"sudokus\": [...]}}. Error: {e}")
+            return
+        engine = data.get('engine', BACKTRACK)
+        if engine not in ENGINES:
+            self.handle_error(400, f"Bad Request: engine must be one of {', '.join(ENGINES)}")
+            return
+
+        self.start_chunked('application/x-ndjson')
+        try:
+            for index, result in self.solve_batch(sudokus, engine):
+                self.write_chunk(encode({"index": index, **result}) + b"\n")
+            self.end_chunked()
+        except (BrokenPipeError, ConnectionResetError) as e:
+            self.close_connection = True
+            print(f"Batch client went away: {e}")
+
+    def solve_batch(self, sudokus, engine=BACKTRACK):
+        """Yield (index, response) pairs in completion order."""
+        items = enumerate(sudokus)
+        pending = {}
+        while True:
+            for index, grid in items:
+                request_payload = self.create_request_payload({"sudoku": grid, "engine": engine}, 'solve')
+                pending[self.anchor_pool.submit(self.anchor_server_address, request_payload)] = index
+                if len(pending) >= self.batch_window:
+                    break
+            if not pending:
+                return
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                index = pending.pop(future)
+                try:
+                    yield index, future.result()
+                except Exception as e:
+                    yield index, {"error": str(e)}
+
     def process_get_request(self):
         """Process GET request for stats or network information."""
         endpoint = self.path.strip("/")
@@ -46,14 +94,22 @@ class SudokuServerHandler(BaseHTTPRequestHandler):
             self.handle_error(500, f"Internal Server Error: {e}")
             print(f"Exception: {e}")
 
+    def process_trace_request(self):
+        """Process GET request for the trace of one solve."""
+        try:
+            request_payload = self.create_request_payload({"id": self.path[len('/trace/'):]}, 'trace')
+            response = self.anchor_pool.request(self.anchor_server_address, request_payload)
+            self.send_body(encode(response), status=404 if "error" in response else 200)
+        except Exception as e:
+            self.handle_error(500, f"Internal Server Error: {e}")
+            print(f"Exception: {e}")
+
     def send_request_to_anchor(self, data, endpoint):
         """Send request to the anchor server and get response."""
         try:
-            with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
-                sock.connect(self.anchor_server_address)
-                request_payload = self.create_request_payload(data, endpoint)
-                sock.sendall(request_payload)
-                return self.read_full_response(sock)
+            request_payload = self.create_request_payload(data, endpoint)
+            response = self.anchor_pool.request(self.anchor_server_address, request_payload)
+            return encode(response)
         except Exception as e:
             print(f"Error communicating with anchor: {e}")
             raise
@@ -63,32 +119,18 @@ class SudokuServerHandler(BaseHTTPRequestHandler):
         return json.loads(raw_data.decode('utf-8'))
 
     def create_request_payload(self, data, endpoint):
-        """Create JSON payload to send to the anchor server."""
-        return json.dumps({"type": endpoint, "data": data}).encode('utf-8')
-
-    def read_full_response(self, sock):
-        """Read full response from the anchor server."""
-        buffer_size = 4096
-        response = b""
-        while True:
-            part = sock.recv(buffer_size)
-            if not part:
-                break
-            response += part
-        return response
+        """Create the message to send to the anchor server."""
+        return {"type": endpoint, "data": data}
 
     def send_response_with_json(self, response_data):
         """Send JSON response to the client."""
-        self.send_response(200)
-        self.send_header('Content-type', 'application/json')
-        self.end_headers()
-        self.wfile.write(response_data)
+        self.send_body(response_data)
 
     def handle_error(self, code, message):
         """Handle HTTP errors with appropriate response."""
         self.send_error(code, message)
 
-def start_server(server_class=HTTPServer, handler_class=SudokuServerHandler, port=8001):
+def start_server(server_class=PooledHTTPServer, handler_class=SudokuServerHandler, port=8001):
     """Start the HTTP server."""
     server_address = ('', port)
     httpd = server_class(server_address, handler_class)
@@ -3,10 +3,446 @@ from collections import deque
 import itertools
 from itertools import product
 
+try:
+    import numpy
+except ImportError:  # optional: nodes must also run on the standard library alone
+    numpy = None
+
+ALL_DIGITS = 0x3FE  # bits 1..9
+ROW_OF = [i // 9 for i in range(81)]
+COL_OF = [i % 9 for i in range(81)]
+BOX_OF = [(i // 27) * 3 + (i % 9) // 3 for i in range(81)]
+HOUSES = (
+    [[r * 9 + c for c in range(9)] for r in range(9)]
+    + [[r * 9 + c for r in range(9)] for c in range(9)]
+    + [[(b // 3) * 27 + (b % 3) * 3 + (i // 3) * 9 + i % 3 for i in range(9)] for b in range(9)]
+)
+POPCOUNT = [bin(mask).count("1") for mask in range(1 << 10)]
+DIGIT_OF = {0: 0, **{1 << digit: digit for digit in range(1, 10)}}
+
+BACKTRACK = 'backtrack'  # PropagationSolver for full grids, PartialSolver for row slices
+DLX = 'dlx'  # DancingLinksSolver for both
+ENGINES = (BACKTRACK, DLX)
+
+
+class Board:
+    """A grid, or a slice of rows starting at row `top`, packed one byte per
+    cell, with the digits placed in every row, column and box as bitmasks.
+
+    clone() is copy-on-write: the copy shares the cells and masks with the
+    original until either of them places or clears a digit."""
+    __slots__ = ('height', 'box_of', 'cells', 'rows', 'cols', 'boxes', 'shared')
+
+    def __init__(self, height=9, top=0):
+        self.height = height
+        self.box_of = BOX_OF if top == 0 else BOX_OF[top * 9:(top + height) * 9]
+        self.cells = bytearray(height * 9)
+        self.rows = [0] * height
+        self.cols = [0] * 9
+        self.boxes = [0] * 9
+        self.shared = False
+
+    @classmethod
+    def from_grid(cls, grid, top=0):
+        """Load a grid or row slice, or return None if a digit repeats."""
+        return cls.from_bytes(pack_grid(grid), top)
+
+    @classmethod
+    def from_bytes(cls, data, top=0):
+        board = cls(len(data) // 9, top)
+        for i, digit in enumerate(data):
+            if digit and not board.place(i, digit):
+                return None
+        return board
+
+    def clone(self):
+        copy = Board.__new__(Board)
+        copy.height, copy.box_of = self.height, self.box_of
+        copy.cells, copy.rows, copy.cols, copy.boxes = self.cells, self.rows, self.cols, self.boxes
+        copy.shared = self.shared = True
+        return copy
+
+    def _own(self):
+        self.cells = bytearray(self.cells)
+        self.rows, self.cols, self.boxes = self.rows[:], self.cols[:], self.boxes[:]
+        self.shared = False
+
+    def candidates(self, i):
+        return ALL_DIGITS & ~(self.rows[ROW_OF[i]] | self.cols[COL_OF[i]] | self.boxes[self.box_of[i]])
+
+    def place(self, i, digit):
+        """Write a digit into an empty cell unless its row, column or box has it."""
+        bit = 1 << digit
+        r, c, b = ROW_OF[i], COL_OF[i], self.box_of[i]
+        rows, cols, boxes = self.rows, self.cols, self.boxes
+        if (rows[r] | cols[c] | boxes[b]) & bit:
+            return False
+        if self.shared:
+            self._own()
+            rows, cols, boxes = self.rows, self.cols, self.boxes
+        self.cells[i] = digit
+        rows[r] |= bit
+        cols[c] |= bit
+        boxes[b] |= bit
+        return True
+
+    def clear(self, i):
+        bit = 1 << self.cells[i]
+        if self.shared:
+            self._own()
+        self.cells[i] = 0
+        self.rows[ROW_OF[i]] &= ~bit
+        self.cols[COL_OF[i]] &= ~bit
+        self.boxes[self.box_of[i]] &= ~bit
+
+    def is_full(self):
+        return 0 not in self.cells
+
+    def to_bytes(self):
+        return bytes(self.cells)
+
+    def to_grid(self):
+        return unpack_grids(self.cells, self.height)[0]
+
+
+class PropagationSolver:
+    """Backtracking solver that propagates naked and hidden singles over
+    per-row, per-column and per-box bitmasks of the digits already placed."""
+
+    def __init__(self, grid, on_validation=None):
+        self.grid = grid
+        self.on_validation = on_validation
+        self.validations = 0
+
+    def solve(self, limit=None):
+        return list(itertools.islice(self.iter_solutions(), limit))
+
+    def iter_solutions(self):
+        state = self._initial_state()
+        if state is not None and self._propagate(state):
+            yield from self._search(state)
+
+    def split(self, count):
+        """Expand the search tree breadth-first, branching on the most
+        constrained cell, until there are at least `count` open subtrees.
+        Each subtree is returned as a full grid with its branch filled in."""
+        state = self._initial_state()
+        if state is None or not self._propagate(state):
+            return []
+
+        frontier = deque([state])
+        while frontier and len(frontier) < count:
+            state = frontier.popleft()
+            best, best_candidates = self._most_constrained(state)
+            if best is None:
+                frontier.appendleft(state)
+                break
+            while best_candidates:
+                bit = best_candidates & -best_candidates
+                best_candidates ^= bit
+                branch = state.clone()
+                if self._place(branch, best, bit) and self._propagate(branch):
+                    frontier.append(branch)
+        return [state.to_grid() for state in frontier]
+
+    def _initial_state(self):
+        state = Board()
+        for i in range(81):
+            value = self.grid[i // 9][i % 9]
+            if value and not self._place(state, i, 1 << value):
+                return None
+        return state
+
+    def _place(self, state, i, bit):
+        self.validations += 1
+        if self.on_validation:
+            self.on_validation()
+        return state.place(i, DIGIT_OF[bit])
+
+    def _propagate(self, state):
+        if state.shared:
+            state._own()  # so `cells` stays the buffer that placing writes to
+        cells = state.cells
+        candidates_of = state.candidates
+        changed = True
+        while changed:
+            changed = False
+            # Naked singles: a cell with a single candidate left.
+            for i in range(81):
+                if cells[i]:
+                    continue
+                candidates = candidates_of(i)
+                if not candidates:
+                    return False
+                if not candidates & (candidates - 1):
+                    self._place(state, i, candidates)
+                    changed = True
+            # Hidden singles: a digit that fits in only one cell of a house.
+            for house in HOUSES:
+                placed = 0
+                seen_once = 0
+                seen_twice = 0
+                for i in house:
+                    if cells[i]:
+                        placed |= 1 << cells[i]
+                        continue
+                    candidates = candidates_of(i)
+                    seen_twice |= seen_once & candidates
+                    seen_once |= candidates
+                if (placed | seen_once) != ALL_DIGITS:
+                    return False
+                singles = seen_once & ~seen_twice & ~placed
+                if not singles:
+                    continue
+                for i in house:
+                    if cells[i]:
+                        continue
+                    bit = candidates_of(i) & singles
+                    if bit:
+                        if bit & (bit - 1) or not self._place(state, i, bit):
+                            return False
+                        changed = True
+        return True
+
+    def _most_constrained(self, state):
+        cells = state.cells
+        best, best_candidates, best_count = None, 0, 10
+        for i in range(81):
+            if cells[i]:
+                continue
+            candidates = state.candidates(i)
+            count = POPCOUNT[candidates]
+            if count < best_count:
+                best, best_candidates, best_count = i, candidates, count
+                if count <= 2:
+                    break
+        return best, best_candidates
+
+    def _search(self, state):
+        best, best_candidates = self._most_constrained(state)
+        if best is None:
+            yield state.to_bytes()
+            return
+
+        while best_candidates:
+            bit = best_candidates & -best_candidates
+            best_candidates ^= bit
+            branch = state.clone()
+            if self._place(branch, best, bit) and self._propagate(branch):
+                yield from self._search(branch)
+
+
+class PartialSolver:
+    """Streams the fillings of a row slice that have no repeated digit in any
+    of its rows or columns, pruning a branch as soon as a digit conflicts."""
+
+    def __init__(self, grid, on_validation=None):
+        self.grid = grid
+        self.on_validation = on_validation
+        self.validations = 0
+
+    def solve(self, limit=None):
+        return list(itertools.islice(self.iter_solutions(), limit))
+
+    def iter_solutions(self):
+        """Yield each filling packed one byte per cell, as Board.to_bytes() does."""
+        rows = [0] * len(self.grid)
+        cols = [0] * 9
+        empty_positions = []
+        for row in range(len(self.grid)):
+            for col in range(9):
+                value = self.grid[row][col]
+                if not value:
+                    empty_positions.append((row, col))
+                    continue
+                bit = 1 << value
+                if (rows[row] | cols[col]) & bit:
+                    return
+                rows[row] |= bit
+                cols[col] |= bit
+
+        work = bytearray(pack_grid(self.grid))
+        yield from self._search(work, rows, cols, empty_positions, 0)
+
+    def _search(self, work, rows, cols, empty_positions, depth):
+        if depth == len(empty_positions):
+            yield bytes(work)
+            return
+
+        row, col = empty_positions[depth]
+        for number in range(1, 10):
+            bit = 1 << number
+            self.validations += 1
+            if self.on_validation:
+                self.on_validation()
+            if (rows[row] | cols[col]) & bit:
+                continue
+            work[row * 9 + col] = number
+            rows[row] |= bit
+            cols[col] |= bit
+            yield from self._search(work, rows, cols, empty_positions, depth + 1)
+            rows[row] ^= bit
+            cols[col] ^= bit
+        work[row * 9 + col] = 0
+
+
+class DancingLinksSolver:
+    """Knuth's Algorithm X over the exact-cover form of a full grid or of a
+    row slice, always branching on the constraint with the fewest options.
+
+    Each placement of a digit in a cell is a row of the exact-cover matrix
+    that covers four constraints: the cell holds a digit, and the digit
+    appears in that row, that column and that box. A row slice, as
+    PartialSolver sees it, has no box constraint, and as it has fewer than
+    nine rows its column constraints are secondary: covered at most once
+    rather than exactly once.
+
+    The constraints are kept as sets of placements rather than circular
+    linked lists, which is faster in Python; covering a placement takes its
+    conflicting placements out of every set, and uncovering puts them back
+    in reverse order, as the links of Dancing Links do."""
+
+    def __init__(self, grid, on_validation=None):
+        self.grid = grid
+        self.on_validation = on_validation
+        self.validations = 0
+
+    def solve(self, limit=None):
+        return list(itertools.islice(self.iter_solutions(), limit))
+
+    def count(self, limit=None):
+        """The number of solutions, stopping at `limit`; limit=2 tells a
+        puzzle with a unique solution from one with several."""
+        return sum(1 for _ in itertools.islice(self.iter_solutions(), limit))
+
+    def iter_solutions(self):
+        """Yield each solution packed one byte per cell, as Board.to_bytes() does."""
+        self.primary, self.placements, columns = exact_cover(len(self.grid))
+        self.columns = {column: set(options) for column, options in columns.items()}
+
+        work = bytearray(pack_grid(self.grid))
+        for i, value in enumerate(work):
+            if not value:
+                continue
+            placement = i * 9 + value - 1
+            self._validate()
+            # A given that shares a constraint with an earlier one contradicts it
+            if not all(column in self.columns for column in self.placements[placement]):
+                return
+            self._cover(placement)
+        yield from self._search(work)
+
+    def _validate(self):
+        self.validations += 1
+        if self.on_validation:
+            self.on_validation()
+
+    def _cover(self, placement):
+        columns = self.columns
+        placements = self.placements
+        removed = []
+        for column in placements[placement]:
+            for other in columns[column]:
+                for other_column in placements[other]:
+                    if other_column != column:
+                        columns[other_column].discard(other)
+            removed.append(columns.pop(column))
+        return removed
+
+    def _uncover(self, placement, removed):
+        columns = self.columns
+        placements = self.placements
+        for column in reversed(placements[placement]):
+            columns[column] = removed.pop()
+            for other in columns[column]:
+                for other_column in placements[other]:
+                    if other_column != column:
+                        columns[other_column].add(other)
+
+    def _search(self, work):
+        best, best_size = None, 10
+        for column, options in self.columns.items():
+            if column < self.primary and len(options) < best_size:
+                best, best_size = column, len(options)
+                if best_size <= 1:
+                    break
+        if best is None:
+            yield bytes(work)
+            return
+
+        for placement in list(self.columns[best]):
+            self._validate()
+            cell, digit = divmod(placement, 9)
+            work[cell] = digit + 1
+            removed = self._cover(placement)
+            yield from self._search(work)
+            self._uncover(placement, removed)
+            work[cell] = 0
+
+
+EXACT_COVER = {}  # height -> exact_cover(height)
+
+
+def exact_cover(height):
+    """The exact-cover matrix of a grid of `height` rows, built once per height:
+    the number of primary constraints, which come first, the constraints of
+    each placement (cell * 9 + digit - 1), and the placements of each
+    constraint."""
+    if height not in EXACT_COVER:
+        cells = height * 9
+        if height == 9:
+            # Cell, row, column and box constraints, all primary
+            primary = 4 * 81
+            constraints = lambda i, d: (i, 81 + ROW_OF[i] * 9 + d, 162 + COL_OF[i] * 9 + d, 243 + BOX_OF[i] * 9 + d)
+        else:
+            # Cell and row constraints are primary, the column ones secondary
+            primary = 2 * cells
+            constraints = lambda i, d: (i, cells + ROW_OF[i] * 9 + d, 2 * cells + COL_OF[i] * 9 + d)
+        placements = {i * 9 + d: constraints(i, d) for i in range(cells) for d in range(9)}
+        columns = {}
+        for placement, covered in placements.items():
+            for column in covered:
+                columns.setdefault(column, set()).add(placement)
+        EXACT_COVER[height] = primary, placements, columns
+    return EXACT_COVER[height]
+
+
+class RateLimiter:
+    """Token bucket behind Sudoku._limit_calls.
+
+    The bucket holds `threshold` tokens and refills at `threshold` tokens per
+    `interval` seconds, so that many calls per interval are free. A call that
+    finds it empty sleeps base_delay, so once the burst is spent every
+    validation costs exactly the handicap. Each call costs O(1) time and the
+    limiter keeps O(1) state."""
+
+    def __init__(self, threshold=5):
+        self.tokens = float(threshold)
+        self.last = time.monotonic()
+
+    def acquire(self, base_delay, interval, threshold):
+        """Take a token and return how long the caller must sleep."""
+        now = time.monotonic()
+        self.tokens = min(threshold, self.tokens + (now - self.last) * threshold / interval)
+        self.last = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0
+        return base_delay
+
+
+class Cancelled(Exception):
+    """The search was stopped early through its cancel event."""
+
+
 class Sudoku:
-    def __init__(self, sudoku):
+    def __init__(self, sudoku, base_delay=0.01, interval=10, threshold=5):
         self.grid = sudoku
-        self.recent_requests = deque()
+        self.base_delay = base_delay
+        self.interval = interval
+        self.threshold = threshold
+        self.limiter = RateLimiter(threshold)
+        self.validations = 0
         self.initial_grid = [row[:] for row in sudoku]
 
     def __str__(self):
@@ -24,26 +460,26 @@ class Sudoku:
 
         return string_representation
 
-    def check_row(self, row, base_delay=0.01, interval=10, threshold=5):
+    def check_row(self, row, base_delay=None, interval=None, threshold=None):
         self._limit_calls(base_delay, interval, threshold)
         if sum(self.grid[row]) != 45 or len(set(self.grid[row])) != 9:
             return False
         return True
 
-    def check_column(self, col, base_delay=0.01, interval=10, threshold=5):
+    def check_column(self, col, base_delay=None, interval=None, threshold=None):
         self._limit_calls(base_delay, interval, threshold)
         if sum([self.grid[row][col] for row in range(9)]) != 45 or len(set([self.grid[row][col] for row in range(9)])) != 9:
             return False
         return True
 
-    def check_square(self, row, col, base_delay=0.01, interval=10, threshold=5):
+    def check_square(self, row, col, base_delay=None, interval=None, threshold=None):
         self._limit_calls(base_delay, interval, threshold)
         square = [self.grid[row + i][col + j] for i in range(3) for j in range(3)]
         if sum(square) != 45 or len(set(square)) != 9:
             return False
         return True
 
-    def check(self, base_delay=0.01, interval=10, threshold=5):
+    def check(self, base_delay=None, interval=None, threshold=None):
         for row in range(9):
             if not self.check_row(row, base_delay, interval, threshold):
                 return False
@@ -56,24 +492,18 @@ class Sudoku:
                     return False
         return True
 
-    def _limit_calls(self, base_delay=0.01, interval=10, threshold=5):
-            """Limit the number of requests made to the Sudoku object."""
-            if base_delay is None:
-                base_delay = self.base_delay
-            if interval is None:
-                interval = self.interval
-            if threshold is None:
-                threshold = self.threshold
-
-            current_time = time.time()
-            self.recent_requests.append(current_time)
-            num_requests = len(
-                [t for t in self.recent_requests if current_time - t < interval]
-            )
-
-            if num_requests > threshold:
-                delay = base_delay * (num_requests - threshold + 1)
-                time.sleep(delay)
+    def _limit_calls(self, base_delay=None, interval=None, threshold=None):
+        """Limit the number of requests made to the Sudoku object."""
+        if base_delay is None:
+            base_delay = self.base_delay
+        if interval is None:
+            interval = self.interval
+        if threshold is None:
+            threshold = self.threshold
+
+        delay = self.limiter.acquire(base_delay, interval, threshold)
+        if delay > 0:
+            time.sleep(delay)
 
     def is_valid_partial(self, part):
         for row in part:
@@ -96,46 +526,153 @@ class Sudoku:
         return True
 
 
-    def solve(self, grid):
-        def generate_combinations(current_combo, remaining_positions):
-            if not remaining_positions:
-                all_combinations.append(tuple(current_combo))
-                return
-            for number in range(1, 10):
-                current_combo.append(number)
-                generate_combinations(current_combo, remaining_positions[1:])
-                current_combo.pop()
-
-        empty_positions = []
-        for row in range(len(grid)):
-            for col in range(9):
-                if grid[row][col] == 0:
-                    empty_positions.append((row, col))
-
-        all_combinations = []
-        generate_combinations([], empty_positions)
+    def iter_solutions(self, grid, throttle=False, cancel=None, packed=False, engine=BACKTRACK):
+        """Yield the solutions of a full grid, or of a row slice, one at a time,
+        as lists of rows or, with packed, as bytes of one byte per cell.
+
+        With throttle, every validation the solver makes goes through
+        _limit_calls, so a node's handicap slows its search. With a cancel
+        event, every validation also checks it and raises Cancelled once set.
+        The engine is one of ENGINES."""
+        solver = self._solver(grid, engine)(grid, self._validation_hook(throttle, cancel))
+        self.validations = 0
+        try:
+            for solution in solver.iter_solutions():
+                yield solution if packed else unpack_grids(solution, len(grid))[0]
+        finally:
+            self.validations = solver.validations
+
+    @staticmethod
+    def _solver(grid, engine):
+        if engine == DLX:
+            return DancingLinksSolver
+        if engine != BACKTRACK:
+            raise ValueError(f"Unknown engine: {engine}")
+        return PropagationSolver if len(grid) == 9 else PartialSolver
+
+    def _validation_hook(self, throttle, cancel):
+        throttled = throttle and self.base_delay
+        if cancel is None:
+            return self._limit_calls if throttled else None
+
+        def on_validation():
+            if cancel.is_set():
+                raise Cancelled()
+            if throttled:
+                self._limit_calls()
+        return on_validation
+
+    def solve(self, grid, limit=None, throttle=False, cancel=None, packed=False, engine=BACKTRACK):
+        stream = self.iter_solutions(grid, throttle, cancel, packed, engine)
+        solutions = list(itertools.islice(stream, limit))
+        stream.close()
+        return solutions, self.validations
+
+    def count_solutions(self, grid, limit=None):
+        """Count the solutions of a full grid or a row slice, up to `limit`,
+        without keeping them; count_solutions(grid, 2)[0] == 1 means the
+        puzzle has a unique solution."""
+        solver = DancingLinksSolver(grid)
+        return solver.count(limit), solver.validations
+
+    def split_search(self, grid, count):
+        """Split a full grid into at least `count` independent subproblems."""
+        solver = PropagationSolver(grid)
+        subproblems = solver.split(count)
+        return subproblems, solver.validations
+
+
+def validate_batch(grids, partial=False):
+    """Validate many grids in one call and return one boolean per grid.
+
+    A full grid is valid when every row, column and box holds 1..9 exactly
+    once. With partial, grids may be row slices with empty cells, and are
+    valid when no row or column repeats a digit (like is_valid_partial).
+    Grids are lists of rows or bytes of one byte per cell (Board.to_bytes()).
+    Uses NumPy when it is installed and plain Python otherwise."""
+    if not grids:
+        return []
+    packed = isinstance(grids[0], (bytes, bytearray))
+    if numpy is not None:
+        if packed:
+            cells = numpy.frombuffer(b"".join(grids), dtype=numpy.uint8).reshape(len(grids), -1, 9)
+        else:
+            cells = numpy.asarray(grids, dtype=numpy.uint8)
+        return _validate_batch_numpy(cells, partial).tolist()
+    if packed:
+        grids = [unpack_grids(grid, len(grid) // 9)[0] for grid in grids]
+    if partial:
+        return [_valid_partial(grid) for grid in grids]
+    return [_valid_full(grid) for grid in grids]
+
+
+def _validate_batch_numpy(cells, partial):
+    if partial:
+        counts = cells[..., None] == numpy.arange(1, 10, dtype=numpy.uint8)
+        rows_ok = (counts.sum(axis=2) <= 1).all(axis=(1, 2))
+        cols_ok = (counts.sum(axis=1) <= 1).all(axis=(1, 2))
+        return rows_ok & cols_ok
+
+    # Nine cells OR to the nine digit bits only if they are 1..9 exactly once.
+    bits = numpy.left_shift(numpy.uint16(1), numpy.minimum(cells, 15).astype(numpy.uint16))
+    rows = numpy.bitwise_or.reduce(bits, axis=2)
+    cols = numpy.bitwise_or.reduce(bits, axis=1)
+    boxes = numpy.bitwise_or.reduce(bits.reshape(-1, 3, 3, 3, 3), axis=(2, 4))
+    return (
+        (rows == ALL_DIGITS).all(axis=1)
+        & (cols == ALL_DIGITS).all(axis=1)
+        & (boxes == ALL_DIGITS).all(axis=(1, 2))
+    )
+
+
+def _valid_full(grid):
+    if len(grid) != 9:
+        return False
+    rows, cols, boxes = [0] * 9, [0] * 9, [0] * 9
+    for r, row in enumerate(grid):
+        for c, value in enumerate(row):
+            if not 0 < value < 10:
+                return False
+            bit = 1 << value
+            rows[r] |= bit
+            cols[c] |= bit
+            boxes[r // 3 * 3 + c // 3] |= bit
+    return all(mask == ALL_DIGITS for mask in rows + cols + boxes)
+
+
+def _valid_partial(grid):
+    rows, cols = [0] * len(grid), [0] * 9
+    for r, row in enumerate(grid):
+        for c, value in enumerate(row):
+            if not value:
+                continue
+            bit = 1 << value
+            if (rows[r] | cols[c]) & bit:
+                return False
+            rows[r] |= bit
+            cols[c] |= bit
+    return True
 
-        solutions = []
-        validation_count = 0
 
-        def try_combination(combo):
-            nonlocal validation_count
-            for (pos, num) in zip(empty_positions, combo):
-                row, col = pos
-                grid[row][col] = num
-                validation_count += 1
+def pack_grid(grid):
+    """One byte per cell, row after row."""
+    return bytes(value for row in grid for value in row)
 
-            if self.is_valid_partial(grid):
-                solutions.append([row[:] for row in grid])
 
-            for pos in empty_positions:
-                row, col = pos
-                grid[row][col] = 0
+def unpack_grids(data, rows):
+    """Split a blob of packed grids of `rows` rows each back into lists."""
+    size = rows * 9
+    return [
+        [list(data[start + r * 9:start + r * 9 + 9]) for r in range(rows)]
+        for start in range(0, len(data), size)
+    ]
 
-        for combo in all_combinations:
-            try_combination(combo)
 
-        return solutions, validation_count
+def solve_packed(packed, limit=None, base_delay=0, engine=BACKTRACK):
+    """Process pool entry point: solve a packed grid, return packed solutions."""
+    grid = unpack_grids(packed, len(packed) // 9)[0]
+    solutions, validations = Sudoku(grid, base_delay).solve(grid, limit, throttle=True, packed=True, engine=engine)
+    return b"".join(solutions), validations
 
 
 if __name__ == "__main__":
@@ -0,0 +1,78 @@
+"""Per-solve traces: where the time of one distributed solve went.
+
+The node coordinating a solve opens a Trace, records a span for each of its
+phases (cache lookup, split, search or distribute, combine) and one per
+request it sends, and keeps the trace in a bounded ring of recent traces.
+The trace id travels in the "trace" field of the solve_part and
+solve_subtree messages. The worker times its own side of the request and
+returns those spans in the reply, where they are kept under "remote" in the
+coordinator's span for that request.
+
+Span times come from time.monotonic() and are given in milliseconds from the
+start of the trace on the node that recorded them, so spans from different
+nodes are only comparable through their durations.
+"""
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+
+
+class Trace:
+    def __init__(self, trace_id, node):
+        self.id = trace_id
+        self.node = node
+        self.started = time.time()
+        self.origin = time.monotonic()
+        self.spans = []
+        self.lock = threading.Lock()
+
+    def add(self, name, start, end, **attributes):
+        """Record a span between two time.monotonic() readings."""
+        span = {
+            "name": name,
+            "node": self.node,
+            "start_ms": round((start - self.origin) * 1000, 3),
+            "duration_ms": round((end - start) * 1000, 3),
+            **attributes
+        }
+        with self.lock:
+            self.spans.append(span)
+
+    @contextmanager
+    def span(self, name, **attributes):
+        """Time the body of a with block; it may add attributes to the dict it gets."""
+        start = time.monotonic()
+        try:
+            yield attributes
+        finally:
+            self.add(name, start, time.monotonic(), **attributes)
+
+    def snapshot(self):
+        with self.lock:
+            spans = list(self.spans)
+        return {"trace": self.id, "node": self.node, "started": self.started, "spans": spans}
+
+
+class Tracer:
+    """The traces of the most recent CAPACITY solves this node coordinated."""
+    CAPACITY = 256
+
+    def __init__(self, node):
+        self.node = node
+        self.traces = OrderedDict()
+        self.lock = threading.Lock()
+
+    def start(self):
+        trace = Trace(uuid.uuid4().hex[:16], self.node)
+        with self.lock:
+            self.traces[trace.id] = trace
+            if len(self.traces) > self.CAPACITY:
+                self.traces.popitem(last=False)
+        return trace
+
+    def get(self, trace_id):
+        with self.lock:
+            trace = self.traces.get(trace_id)
+        return None if trace is None else trace.snapshot()